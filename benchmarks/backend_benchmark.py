@@ -0,0 +1,79 @@
+# This script compares the inference backends of a model (PyTorch, ONNX, OpenVINO) on CPU, on identical frames.
+# Every backend predicts the same sampled frames of a local video, the boxes are compared with the PyTorch boxes.
+# Usage: python benchmarks/backend_benchmark.py --video /tmp/video.mp4 --model yolov8n.pt --backends pytorch onnx openvino
+import argparse
+import os
+import sys
+import time
+
+from ultralytics import YOLO
+from ultralytics.utils.metrics import box_iou
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.frames import read_frames  # noqa: E402
+from projects.base_project import BaseProject  # noqa: E402
+
+
+def matching_boxes(reference, boxes, iou=0.5):
+    """
+    Count the reference boxes that have a box of the same class with an IoU above iou.
+
+    Args:
+        reference: The reference boxes (ultralytics Boxes).
+        boxes: The boxes to compare (ultralytics Boxes).
+        iou: Minimum IoU of matching boxes.
+
+    Returns:
+        int: Number of matched reference boxes.
+    """
+    if not len(reference) or not len(boxes):
+        return 0
+    same_class = reference.cls[:, None] == boxes.cls[None, :]
+    return int(((box_iou(reference.xyxy, boxes.xyxy) > iou) & same_class).any(dim=1).sum())
+
+
+def init():
+    parser = argparse.ArgumentParser(description='Benchmark the inference backends of a model on CPU.')
+    parser.add_argument('--video', default='/tmp/video.mp4', help='Local video to read the frames from.')
+    parser.add_argument('--frames', type=int, default=64, help='Number of sampled frames to predict.')
+    parser.add_argument('--frame-skip-factor', type=int, default=6, help='Keep every n-th frame of the video.')
+    parser.add_argument('--model', default='yolov8n.pt', help='Weights in the models folder.')
+    parser.add_argument('--backends', nargs='+', default=list(BaseProject.BACKENDS), choices=BaseProject.BACKENDS)
+    parser.add_argument('--conf', type=float, default=0.25, help='Confidence threshold of the boxes.')
+    args = parser.parse_args()
+
+    weights_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', args.model)
+    frames = read_frames(args.video, args.frames, args.frame_skip_factor)
+    print(f'Loaded {len(frames)} frames from {args.video}')
+
+    reference = None
+    print(f'{"backend":>9} | {"frames/sec":>10} | {"ms/frame":>8} | {"boxes":>6} | {"matching PyTorch":>16}')
+    for backend in args.backends:
+        if backend == 'pytorch':
+            model = YOLO(weights_path).to('cpu')
+        else:
+            model = YOLO(BaseProject.export_model(weights_path, backend), task='detect')
+        # Warm up the model, so the predictor setup is not measured.
+        model.predict(source=frames[0], verbose=False, conf=args.conf, device='cpu')
+
+        boxes = []
+        start_time = time.time()
+        for frame in frames:
+            boxes.append(model.predict(source=frame, verbose=False, conf=args.conf, device='cpu')[0].boxes.cpu())
+        total_time = time.time() - start_time
+
+        if reference is None and backend == 'pytorch':
+            reference = boxes
+        number_of_boxes = sum(len(frame_boxes) for frame_boxes in boxes)
+        matching = '-'
+        if reference is not None:
+            number_of_reference_boxes = sum(len(frame_boxes) for frame_boxes in reference)
+            matched = sum(matching_boxes(ref, frame_boxes) for ref, frame_boxes in zip(reference, boxes))
+            matching = f'{matched / number_of_reference_boxes:.1%}' if number_of_reference_boxes else '-'
+        print(f'{backend:>9} | {len(frames) / total_time:>10.2f} | {total_time * 1000 / len(frames):>8.1f} | '
+              f'{number_of_boxes:>6} | {matching:>16}')
+
+
+# Run the init function.
+init()
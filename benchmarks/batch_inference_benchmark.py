@@ -0,0 +1,46 @@
+# This script measures the throughput of condition.process_frames for different batch sizes on CPU.
+# It reads the sampled frames of a local video once, then runs every batch size over the same frames.
+# Usage: python benchmarks/batch_inference_benchmark.py --video /tmp/video.mp4 --batch-sizes 1 2 4 8 16
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.frames import read_frames  # noqa: E402
+from condition import process_frames  # noqa: E402
+from projects.project_factory import ProjectFactory  # noqa: E402
+
+
+def init():
+    parser = argparse.ArgumentParser(description='Benchmark batched inference against batch size on CPU.')
+    parser.add_argument('--video', default='/tmp/video.mp4', help='Local video to read the frames from.')
+    parser.add_argument('--frames', type=int, default=64, help='Number of sampled frames to evaluate.')
+    parser.add_argument('--frame-skip-factor', type=int, default=6, help='Keep every n-th frame of the video.')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    project = ProjectFactory().init()
+    frames = read_frames(args.video, args.frames, args.frame_skip_factor)
+    print(f'Loaded {len(frames)} frames from {args.video}')
+
+    project.device = 'cpu'
+    # Warm up the models, so the first measured batch size does not pay for the predictor setup.
+    process_frames(frames[:1], project, cv2)
+
+    print(f'{"batch size":>10} | {"frames/sec":>10} | {"total (s)":>9}')
+    for batch_size in args.batch_sizes:
+        project.reset_models()
+        project.device = 'cpu'
+        start_time = time.time()
+        for index in range(0, len(frames), batch_size):
+            process_frames(frames[index:index + batch_size], project, cv2)
+        total_time = time.time() - start_time
+        print(f'{batch_size:>10} | {len(frames) / total_time:>10.2f} | {total_time:>9.2f}')
+
+
+# Run the init function.
+init()
@@ -0,0 +1,77 @@
+# This script compares the per-box Python loops that condition functions used with the vectorized
+# BaseProject helpers (has_class, count_class, has_minimum_size) on crowded frames.
+# Usage: python benchmarks/condition_func_benchmark.py --boxes 100 250 500 --repeat 200
+import argparse
+import os
+import sys
+import time
+
+import torch
+from ultralytics.engine.results import Boxes
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from projects.base_project import BaseProject  # noqa: E402
+
+
+def random_boxes(number_of_boxes, number_of_classes=3, device='cpu'):
+    """
+    Create random boxes in a 1920x1080 frame.
+
+    Returns:
+        Boxes: ultralytics Boxes with xyxy, conf and cls.
+    """
+    xy = torch.rand(number_of_boxes, 2) * torch.tensor([1800., 960.])
+    wh = torch.rand(number_of_boxes, 2) * torch.tensor([120., 120.]) + 10
+    conf = torch.rand(number_of_boxes, 1)
+    cls = torch.randint(0, number_of_classes, (number_of_boxes, 1)).float()
+    return Boxes(torch.cat([xy, xy + wh, conf, cls], dim=1).to(device), (1080, 1920))
+
+
+def loop_condition(boxes, class_id, min_width, min_height):
+    """
+    The per-box implementation, as condition functions were written before the helpers.
+    """
+    has_class = any(box.cls == class_id for box in boxes)
+    count = 0
+    for i in range(0, len(boxes)):
+        if boxes[i].cls == class_id:
+            count += 1
+    has_minimum_size = all(box.xywh[0, 2] > min_width and box.xywh[0, 3] > min_height
+                           for box in boxes if box.cls == class_id)
+    return has_class, count, has_minimum_size
+
+
+def vectorized_condition(boxes, class_id, min_width, min_height):
+    """
+    The same checks with the vectorized BaseProject helpers.
+    """
+    return (BaseProject.has_class(boxes, class_id),
+            BaseProject.count_class(boxes, class_id),
+            BaseProject.has_minimum_size(boxes, class_id, min_width, min_height))
+
+
+def init():
+    parser = argparse.ArgumentParser(description='Benchmark per-box loops against vectorized condition helpers.')
+    parser.add_argument('--boxes', type=int, nargs='+', default=[100, 250, 500])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--device', default='cuda' if torch.cuda.is_available() else 'cpu')
+    args = parser.parse_args()
+
+    print(f'{"boxes":>6} | {"loop (ms)":>9} | {"vectorized (ms)":>15} | {"speedup":>7}')
+    for number_of_boxes in args.boxes:
+        boxes = random_boxes(number_of_boxes, device=args.device)
+        if loop_condition(boxes, 2, 30, 100) != vectorized_condition(boxes, 2, 30, 100):
+            raise AssertionError('Vectorized helpers do not match the per-box loops')
+
+        timings = []
+        for condition in (loop_condition, vectorized_condition):
+            start_time = time.time()
+            for _ in range(args.repeat):
+                condition(boxes, 2, 30, 100)
+            timings.append((time.time() - start_time) * 1000 / args.repeat)
+        print(f'{number_of_boxes:>6} | {timings[0]:>9.3f} | {timings[1]:>15.3f} | {timings[0] / timings[1]:>6.1f}x')
+
+
+# Run the init function.
+init()
@@ -0,0 +1,28 @@
+import cv2
+
+
+def read_frames(video_path, number_of_frames, frame_skip_factor):
+    """
+    Read the frames that the harvest service would sample from a video.
+
+    Args:
+        video_path: Path of the video file.
+        number_of_frames: Maximum number of frames to read.
+        frame_skip_factor: Only every frame_skip_factor-th frame is kept.
+
+    Returns:
+        List of frames.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f'Unable to open video file {video_path}')
+
+    frames = []
+    frame_number = 0
+    while len(frames) < number_of_frames and cap.grab():
+        frame_number += 1
+        if frame_number % frame_skip_factor == 0:
+            _, frame = cap.retrieve()
+            frames.append(frame)
+    cap.release()
+    return frames
@@ -0,0 +1,45 @@
+# This script measures the encode time and file size of the export image codecs on sample frames.
+# It reads the sampled frames of a local video once, then encodes every frame with every codec and quality.
+# Usage: python benchmarks/image_codec_benchmark.py --video /tmp/video.mp4 --codecs png:-1 png:9 jpeg:90 webp:80
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.frames import read_frames  # noqa: E402
+from exports.image_codec import ImageCodec  # noqa: E402
+
+
+def init():
+    parser = argparse.ArgumentParser(description='Benchmark encode time and file size of the export image codecs.')
+    parser.add_argument('--video', default='/tmp/video.mp4', help='Local video to read the frames from.')
+    parser.add_argument('--frames', type=int, default=32, help='Number of sampled frames to encode.')
+    parser.add_argument('--frame-skip-factor', type=int, default=6, help='Keep every n-th frame of the video.')
+    parser.add_argument('--codecs', nargs='+', default=['png:-1', 'png:9', 'jpeg:95', 'jpeg:85', 'webp:90', 'webp:75'],
+                        help='Codecs to compare as IMAGE_FORMAT:IMAGE_QUALITY.')
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames, args.frame_skip_factor)
+    print(f'Loaded {len(frames)} frames from {args.video}')
+
+    print(f'{"codec":>10} | {"ms/frame":>8} | {"KB/frame":>8}')
+    for codec in args.codecs:
+        image_format, quality = codec.split(':')
+        image_codec = ImageCodec(image_format, int(quality))
+        params = image_codec.params(cv2)
+
+        total_bytes = 0
+        start_time = time.time()
+        for frame in frames:
+            _, encoded = cv2.imencode(f'.{image_codec.extension}', frame, params)
+            total_bytes += len(encoded)
+        total_time = time.time() - start_time
+        print(f'{codec:>10} | {total_time / len(frames) * 1000:>8.2f} | {total_bytes / len(frames) / 1024:>8.1f}')
+
+
+# Run the init function.
+init()
@@ -0,0 +1,71 @@
+# This script reports the skip rate and the recall of the motion pre-filter (MOTION_THRESHOLD) on a sample corpus.
+# Every sampled frame of the videos is evaluated once by the project, then the filter is replayed for every threshold:
+# the recall is the fraction of the frames meeting the condition that the filter would still evaluate.
+# Usage: python benchmarks/motion_filter_benchmark.py --videos /tmp/a.mp4 /tmp/b.mp4 --thresholds 0.001 0.005 0.02
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.frames import read_frames  # noqa: E402
+from condition import process_frame  # noqa: E402
+from projects.project_factory import ProjectFactory  # noqa: E402
+from services.motion_filter import MotionFilter  # noqa: E402
+
+
+def init():
+    parser = argparse.ArgumentParser(description='Benchmark the skip rate and recall of the motion pre-filter.')
+    parser.add_argument('--videos', nargs='+', default=['/tmp/video.mp4'], help='Local videos of the sample corpus.')
+    parser.add_argument('--frames', type=int, default=200, help='Maximum number of sampled frames per video.')
+    parser.add_argument('--frame-skip-factor', type=int, default=6, help='Keep every n-th frame of the video.')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.001, 0.005, 0.01, 0.02, 0.05])
+    parser.add_argument('--pixel-threshold', type=int, default=25, help='See MOTION_PIXEL_THRESHOLD.')
+    parser.add_argument('--max-skipped', type=int, default=10, help='See MOTION_MAX_SKIPPED.')
+    args = parser.parse_args()
+
+    project = ProjectFactory().init()
+    project.device = 'cpu'
+
+    # Frames and whether they meet the condition, per video.
+    corpus = []
+    total_time = 0
+    for video in args.videos:
+        frames = read_frames(video, args.frames, args.frame_skip_factor)
+        project.reset_models()
+        project.device = 'cpu'
+        start_time = time.time()
+        condition_met = [process_frame(frame, project, cv2)[4] for frame in frames]
+        total_time += time.time() - start_time
+        corpus.append((frames, condition_met))
+        print(f'{video}: {len(frames)} frames, {sum(condition_met)} meet the condition')
+
+    number_of_frames = sum(len(frames) for frames, _ in corpus)
+    number_of_hits = sum(sum(condition_met) for _, condition_met in corpus)
+    print(f'Evaluating all {number_of_frames} frames took {total_time:.2f}s')
+
+    print(f'{"threshold":>9} | {"skip rate":>9} | {"recall":>6} | {"filter (ms/frame)":>17}')
+    for threshold in args.thresholds:
+        motion_filter = MotionFilter(threshold, args.pixel_threshold, args.max_skipped)
+        hits = 0
+        skipped_frames = 0
+        filter_time = 0
+        for frames, condition_met in corpus:
+            motion_filter.reset()
+            for frame, met in zip(frames, condition_met):
+                start_time = time.time()
+                changed = motion_filter.has_changed(frame)
+                filter_time += time.time() - start_time
+                hits += changed and met
+            skipped_frames += motion_filter.skipped_frames
+
+        skip_rate = skipped_frames / number_of_frames if number_of_frames else 0
+        recall = hits / number_of_hits if number_of_hits else 1
+        print(f'{threshold:>9} | {skip_rate:>9.1%} | {recall:>6.1%} | {filter_time * 1000 / number_of_frames:>17.3f}')
+
+
+# Run the init function.
+init()
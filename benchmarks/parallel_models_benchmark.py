@@ -0,0 +1,62 @@
+# This script compares the frame latency of condition.process_frame with sequential and concurrent model execution.
+# It reads the sampled frames of a local video once, then runs both modes over the same frames.
+# Usage: python benchmarks/parallel_models_benchmark.py --video /tmp/video.mp4 --frames 50
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import condition  # noqa: E402
+from benchmarks.frames import read_frames  # noqa: E402
+from projects.project_factory import ProjectFactory  # noqa: E402
+
+
+def measure(frames, project):
+    """
+    Measure the latency of process_frame for every frame.
+
+    Args:
+        frames: List of frames.
+        project: The project holding the models.
+
+    Returns:
+        List of latencies in milliseconds.
+    """
+    project.reset_models()
+    latencies = []
+    for frame in frames:
+        start_time = time.time()
+        condition.process_frame(frame, project, cv2)
+        latencies.append((time.time() - start_time) * 1000)
+    return latencies
+
+
+def init():
+    parser = argparse.ArgumentParser(description='Compare sequential and parallel execution of the project models.')
+    parser.add_argument('--video', default='/tmp/video.mp4', help='Local video to read the frames from.')
+    parser.add_argument('--frames', type=int, default=50, help='Number of sampled frames to evaluate.')
+    parser.add_argument('--frame-skip-factor', type=int, default=6, help='Keep every n-th frame of the video.')
+    args = parser.parse_args()
+
+    project = ProjectFactory().init()
+    frames = read_frames(args.video, args.frames, args.frame_skip_factor)
+    print(f'Loaded {len(frames)} frames from {args.video}, running {len(project.models)} models on {project.device}')
+
+    # Warm up the models, so neither mode pays for the predictor setup.
+    condition.process_frame(frames[0], project, cv2)
+
+    print(f'{"mode":>10} | {"mean (ms)":>9} | {"p50 (ms)":>8} | {"p95 (ms)":>8}')
+    for mode, parallel in (('sequential', False), ('parallel', True)):
+        condition.var.PARALLEL_MODELS = parallel
+        latencies = sorted(measure(frames, project))
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f'{mode:>10} | {statistics.mean(latencies):>9.1f} | {statistics.median(latencies):>8.1f} | {p95:>8.1f}')
+
+
+# Run the init function.
+init()
@@ -0,0 +1,111 @@
+# This script compares the requests to Kerberos Vault with a fresh connection per call (as before the VaultClient)
+# with the pooled keep-alive session of the VaultClient, immediate and batched, against a local HTTP stub.
+# Usage: python benchmarks/vault_client_benchmark.py --requests 200 --media-size 4 --latency 5
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.vault_client import VaultClient  # noqa: E402
+
+
+def start_stub(media_size, latency):
+    """
+    Start a local HTTP/1.1 stub of the Kerberos Vault storage API.
+
+    Args:
+        media_size: Size in bytes of the served media.
+        latency: Seconds every request is delayed, to simulate the network.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    media = os.urandom(media_size)
+
+    class VaultStub(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(media)))
+            self.end_headers()
+            self.wfile.write(media)
+
+        def do_DELETE(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), VaultStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def init():
+    parser = argparse.ArgumentParser(description='Benchmark Kerberos Vault requests against a local HTTP stub.')
+    parser.add_argument('--requests', type=int, default=200, help='Number of deletes and downloads.')
+    parser.add_argument('--media-size', type=int, default=4, help='Size in MB of a downloaded media.')
+    parser.add_argument('--latency', type=float, default=5, help='Milliseconds the stub delays every request.')
+    parser.add_argument('--batch-size', type=int, default=20, help='Number of deletes sent together.')
+    args = parser.parse_args()
+
+    server = start_stub(args.media_size * 1024 * 1024, args.latency / 1000)
+    storage_uri = f'http://127.0.0.1:{server.server_port}'
+    headers = {'X-Kerberos-Storage-FileName': 'key', 'X-Kerberos-Storage-Provider': 'provider'}
+    message = {'payload': {'key': 'key'}, 'source': 'provider'}
+    media_savepath = os.path.join(tempfile.mkdtemp(), 'media.mp4')
+
+    client = VaultClient(storage_uri, 'access', 'secret')
+    batched_client = VaultClient(storage_uri, 'access', 'secret', delete_batch_size=args.batch_size)
+
+    def download(index):
+        response = requests.get(f'{storage_uri}/storage/blob', headers=headers, timeout=10)
+        with open(media_savepath, 'wb') as output:
+            output.write(response.content)
+
+    def batched_delete(index):
+        batched_client.delete_media('key', 'provider')
+        if index == args.requests - 1:
+            batched_client.flush_deletes()
+
+    # The clients print every delete, only the results are of interest here.
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        results = []
+        for name, number_of_requests, request in [
+            ('delete, new connection', args.requests,
+             lambda index: requests.delete(f'{storage_uri}/storage', headers=headers)),
+            ('delete, VaultClient', args.requests, lambda index: client.delete_media('key', 'provider')),
+            (f'delete, batches of {args.batch_size}', args.requests, batched_delete),
+            ('download, new connection', max(args.requests // 10, 1), download),
+            ('download, VaultClient', max(args.requests // 10, 1),
+             lambda index: client.retrieve_media(message, media_savepath)),
+        ]:
+            start_time = time.time()
+            for index in range(number_of_requests):
+                request(index)
+            results.append((name, number_of_requests, time.time() - start_time))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f'{"":>28} | {"req/sec":>8} | {"ms/req":>8}')
+    for name, number_of_requests, total_time in results:
+        print(f'{name:>28} | {number_of_requests / total_time:>8.1f} | {total_time / number_of_requests * 1000:>8.2f}')
+    server.shutdown()
+
+
+# Run the init function.
+init()
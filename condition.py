@@ -1,26 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor
 from utils.VariableClass import VariableClass
+import numpy as np
+import threading
 import time
+import torch
 
 # Initialize the VariableClass object, which contains all the necessary environment variables.
 var = VariableClass()
 
+# Thread pool used to execute the models of a project concurrently, created on first use (see PARALLEL_MODELS).
+_model_executor = None
+_model_executor_lock = threading.Lock()
+# Every thread of the pool gets its own CUDA stream, so the kernels of different models can overlap on the GPU.
+_thread_local = threading.local()
+
 
 def process_frame(frame, project, cv2=None, frames_out=''):
     # Perform object classification on the frame.
     # persist=True -> The tracking results are stored in the model.
     # persist should be kept True, as this provides unique IDs for each detection.
     # More information about the tracking results via https://docs.ultralytics.com/reference/engine/results/
-
-    total_time_class_prediction = 0
-    labels_and_boxes = ''
-    if var.TIME_VERBOSE:
-        start_time_class_prediction = time.time()
+    start_time_class_prediction = time.time()
 
     total_results = []
-    for model, allowed_classes in zip(project.models, project.models_allowed_classes):
-        # Execute every model in the list
-        cur_results = model.track(
-            source=frame,
+    if var.PARALLEL_MODELS:
+        # Execute all models concurrently, the results are still in model order.
+        total_results = [cur_results[0] for cur_results in __track_concurrently__(frame, project)]
+        if not __passes_stages__(project, total_results):
+            return None, '', None, time.time() - start_time_class_prediction, False
+    else:
+        for stage, (model, allowed_classes) in enumerate(zip(project.models, project.models_allowed_classes)):
+            # Execute every model in the list
+            cur_results = __track__(model, frame, allowed_classes, project)
+            total_results.append(cur_results[0])
+
+            # Skip the remaining models when the frame can no longer satisfy the project condition.
+            if not __passes_stage__(project, stage, total_results):
+                return None, '', None, time.time() - start_time_class_prediction, False
+
+    cropped_frame, labels_and_boxes, labeled_frame, condition_met = __evaluate_results__(
+        frame, project, total_results, cv2)
+    return cropped_frame, labels_and_boxes, labeled_frame, time.time() - start_time_class_prediction, condition_met
+
+
+def process_frames(frames, project, cv2=None):
+    """
+    Batched version of process_frame, every model is executed once for all frames.
+
+    Args:
+        frames: List of frames in the order they were read from the video.
+        project: The project holding the models and the condition logic.
+        cv2: The Capture Video agent.
+
+    Returns:
+        List with one (cropped_frame, labels_and_boxes, labeled_frame, total_time_class_prediction, condition_met)
+        tuple per input frame, exactly like process_frame returns them.
+    """
+    start_time_class_prediction = time.time()
+
+    # Frames drop out as soon as they fail a stage of the cascade, the same way process_frame returns early.
+    active_indices = list(range(len(frames)))
+    total_results = [[] for _ in frames]
+    if var.PARALLEL_MODELS:
+        # Execute all models concurrently on the whole batch, frames drop out afterwards.
+        for cur_results in __track_concurrently__(frames, project):
+            for index, results in enumerate(cur_results):
+                total_results[index].append(results)
+        active_indices = [index for index in active_indices if __passes_stages__(project, total_results[index])]
+    else:
+        for stage, (model, allowed_classes) in enumerate(zip(project.models, project.models_allowed_classes)):
+            if not active_indices:
+                break
+
+            # Passing a list runs a single forward pass for the whole batch. In track mode the predictor updates one
+            # tracker with the images in list order, so the tracker sees the same sequence as frame by frame calls.
+            cur_results = __track__(model, [frames[i] for i in active_indices], allowed_classes, project)
+
+            remaining_indices = []
+            for index, results in zip(active_indices, cur_results):
+                total_results[index].append(results)
+                if __passes_stage__(project, stage, total_results[index]):
+                    remaining_indices.append(index)
+            active_indices = remaining_indices
+
+    # Spread the batched prediction time evenly over the frames.
+    prediction_time = (time.time() - start_time_class_prediction) / max(len(frames), 1)
+
+    outputs = []
+    for index, frame in enumerate(frames):
+        if index not in active_indices:
+            outputs.append((None, '', None, prediction_time, False))
+            continue
+
+        start_time_evaluation = time.time()
+        cropped_frame, labels_and_boxes, labeled_frame, condition_met = __evaluate_results__(
+            frame, project, total_results[index], cv2)
+        outputs.append((cropped_frame, labels_and_boxes, labeled_frame,
+                        prediction_time + time.time() - start_time_evaluation, condition_met))
+
+    return outputs
+
+
+def __passes_stage__(project, stage, partial_results):
+    """
+    Check the stage condition of the project after a model was executed, and count the rejected frames.
+
+    Args:
+        project: The project holding the stage conditions.
+        stage: Index of the model that was just executed.
+        partial_results: Results of the models executed so far.
+
+    Returns:
+        bool: True if the frame should continue to the next model.
+    """
+    if project.stage_condition(stage, partial_results):
+        return True
+    project.stage_rejections[stage] += 1
+    return False
+
+
+def __passes_stages__(project, total_results):
+    """
+    Check all stage conditions in order, for results of models that were executed at the same time.
+
+    Args:
+        project: The project holding the stage conditions.
+        total_results: Results of all models.
+
+    Returns:
+        bool: True if the frame passes every stage.
+    """
+    return all(__passes_stage__(project, stage, total_results[:stage + 1]) for stage in range(len(total_results)))
+
+
+def __track__(model, source, allowed_classes, project):
+    """
+    Run a single model in track mode on a frame or a list of frames.
+    When the project has an inference region, the model only predicts the region or its tiles,
+    and the boxes are mapped back into frame coordinates.
+
+    Args:
+        model: The YOLO model to execute.
+        source: A single frame or a list of frames.
+        allowed_classes: Classes the model is allowed to predict.
+        project: The project the model belongs to.
+    """
+    region = project.inference_region
+    if region is None:
+        return model.track(
+            source=source,
             persist=True,
             verbose=False,
             iou=var.IOU,
@@ -28,56 +156,96 @@ def process_frame(frame, project, cv2=None, frames_out=''):
             classes=allowed_classes,
             device=project.device)
 
-        if var.TIME_VERBOSE:
-            total_time_class_prediction += time.time() - start_time_class_prediction
+    frames = source if isinstance(source, list) else [source]
+    views = [region.views(frame) for frame in frames]
+    images = [image for frame_views in views for image, _ in frame_views]
+    arguments = dict(verbose=False, iou=var.IOU, conf=var.CLASSIFICATION_THRESHOLD, classes=allowed_classes,
+                     device=project.device)
+    if region.is_tiled:
+        # The tiles of all frames are predicted in one batch. The tracker would take the tiles for consecutive frames,
+        # so tiled frames are predicted without tracking.
+        view_results = model.predict(source=images, **arguments)
+    else:
+        view_results = model.track(source=images if isinstance(source, list) else images[0], persist=True, **arguments)
+
+    results = []
+    for frame, frame_views in zip(frames, views):
+        frame_results, view_results = view_results[:len(frame_views)], view_results[len(frame_views):]
+        results.append(region.to_frame(frame, frame_results, [offset for _, offset in frame_views]))
+    return results
+
+
+def __track_concurrently__(source, project):
+    """
+    Run all models of the project in track mode at the same time, every model in its own thread.
+    On GPU every thread submits its work on a separate CUDA stream.
+
+    Args:
+        source: A single frame or a list of frames.
+        project: The project holding the models.
+
+    Returns:
+        List with the results of every model, in the order of project.models.
+    """
+    global _model_executor
+    with _model_executor_lock:
+        if _model_executor is None:
+            _model_executor = ThreadPoolExecutor(
+                max_workers=len(project.models) * max(var.NUMBER_OF_WORKERS, 1),
+                thread_name_prefix='model')
 
-        if len(cur_results[0]) == 0:
-            return None, labels_and_boxes, None, total_time_class_prediction, False
+    futures = [_model_executor.submit(__track_on_stream__, model, source, allowed_classes, project)
+               for model, allowed_classes in zip(project.models, project.models_allowed_classes)]
+    return [future.result() for future in futures]
 
-        total_results.append(cur_results[0])
 
+def __track_on_stream__(model, source, allowed_classes, project):
+    """
+    Run a single model in track mode, on the CUDA stream of the current thread when the project runs on GPU.
+
+    Args:
+        model: The YOLO model to execute.
+        source: A single frame or a list of frames.
+        allowed_classes: Classes the model is allowed to predict.
+        project: The project the model belongs to.
+    """
+    if not str(project.device).startswith('cuda'):
+        return __track__(model, source, allowed_classes, project)
+
+    if not hasattr(_thread_local, 'stream'):
+        _thread_local.stream = torch.cuda.Stream()
+    with torch.cuda.stream(_thread_local.stream):
+        results = __track__(model, source, allowed_classes, project)
+    _thread_local.stream.synchronize()
+    return results
+
+
+def __evaluate_results__(frame, project, total_results, cv2=None):
+    """
+    Apply the project condition on the results of all models, then merge, crop and transform the labels.
+
+    Args:
+        frame: The original frame.
+        project: The project holding the condition logic.
+        total_results: List of results, one for every model.
+        cv2: The Capture Video agent.
+
+    Returns:
+        tuple: cropped_frame, labels_and_boxes, labeled_frame and whether the condition is met.
+    """
     # ###############################################
     # This is where the custom logic comes into play
     # ###############################################
-    # Check if the results are not None,
-    #  Otherwise, the postprocessing should not be done.
-    # Iterate over the detected objects and their masks.
-    annotated_frame = frame.copy()
-    combined_results = []
-
     # Check the condition to process frames
     # Since we have over 1k videos per day, the dataset we collect need to be high-quality
     # Valid image need to:
     # + Have at least MIN_DETECTIONS objects detected:
     # + Have to satisfy the project.condition_func which defines custom condition logics for every specific project.
     if project.condition_func(total_results):
-        for index, results in enumerate(total_results):
-            # As a convention we will store all result labels under model1's
-            # The other models' will be mapped accordingly
-            if not combined_results:
-                combined_results += [(box.xywhn, box.xyxy, box.cls, box.conf) for box in results.boxes]
-            else:
-                combined_results += [(box.xywhn, box.xyxy, project.map_to_first_model(index, box.cls), box.conf) for box
-                                     in results.boxes]
-
-        # sort results based on descending confidences
-        sorted_combined_results = sorted(combined_results, key=lambda x: x[2], reverse=True)
-
-        # Remove duplicates (if x and y coordinates of 2 boxes with the same class are < 0.01
-        # -> consider as duplication and remove
-        combined_results = []
-        for element in sorted_combined_results:
-            add_flag = True
-            for res in combined_results:
-                if res[2] == element[2]: # classes comparison
-                    if (abs(res[0][0][0] - element[0][0][0]) < 0.01
-                            and (abs(res[0][0][1] - element[0][0][1]) < 0.01)):
-                        add_flag = False
-            if add_flag:
-                combined_results.append(element)
+        combined_results = __merge_results__(project, total_results)
 
         # If the combined result has at least MIN_DETECTIONS boxes found (Could belong to either class)
-        if len(combined_results) >= var.MIN_DETECTIONS:
+        if len(combined_results[2]) >= var.MIN_DETECTIONS:
             print("Condition met, we are gathering the labels and boxes and return results")
             # Crop frane to get only the interested area to reduce storage waste
             cropped_frame, cropped_coordinate = __crop_frame__(frame, combined_results)
@@ -89,10 +257,76 @@ def process_frame(frame, project, cv2=None, frames_out=''):
 
             # Transform the labels and boxes accordingly
             labels_and_boxes = __transform_labels__(cropped_frame, cropped_coordinate, combined_results)
-            total_time_class_prediction += time.time() - start_time_class_prediction
-            return cropped_frame, labels_and_boxes, labeled_frame, total_time_class_prediction, True
+            return cropped_frame, labels_and_boxes, labeled_frame, True
 
-    return None, labels_and_boxes, None, total_time_class_prediction, False
+    return None, '', None, False
+
+
+def __merge_results__(project, total_results):
+    """
+    Merge the boxes of all models into single arrays and remove duplicated boxes.
+
+    As a convention all result labels are stored under the classes of the first model,
+    the classes of the other models are mapped accordingly. Boxes without a mapped class are dropped.
+    The boxes are ordered by descending class, and by model and box order within a class.
+    A box is removed when a kept box of the same class is a duplicate:
+    - DUPLICATE_SUPPRESSION=center: the centres (xywhn) differ less than 0.01 in both x and y.
+    - DUPLICATE_SUPPRESSION=iou: the IoU is greater than DUPLICATE_IOU.
+    With DUPLICATE_KEEP=first the first of the duplicates in this order is kept, as before the merge was vectorised.
+    With DUPLICATE_KEEP=confidence the boxes are visited in descending confidence, so the most confident one is kept.
+    The kept boxes keep their order.
+
+    Args:
+        project: The project holding the class mapping.
+        total_results: List of results, one for every model.
+
+    Returns:
+        tuple: xywhn, xyxy, cls and conf arrays of the kept boxes.
+    """
+    xywhn, xyxy, cls, conf = [], [], [], []
+    for index, results in enumerate(total_results):
+        boxes = results.boxes.cpu().numpy()
+        model_cls = boxes.cls.astype(np.float64)
+        if index > 0:
+            # Map every distinct class once, instead of every box.
+            mapped = {c: project.map_to_first_model(index, c) for c in np.unique(model_cls).tolist()}
+            model_cls = np.array([-1 if mapped[c] is None else mapped[c] for c in model_cls.tolist()], dtype=np.float64)
+
+        xywhn.append(boxes.xywhn.reshape(-1, 4))
+        xyxy.append(boxes.xyxy.reshape(-1, 4))
+        cls.append(model_cls.reshape(-1))
+        conf.append(boxes.conf.reshape(-1))
+
+    xywhn, xyxy, cls, conf = (np.concatenate(values) for values in (xywhn, xyxy, cls, conf))
+    mapped = cls >= 0
+    xywhn, xyxy, cls, conf = xywhn[mapped], xyxy[mapped], cls[mapped], conf[mapped]
+
+    # Pairwise duplicates, only boxes of the same class can be duplicates of each other.
+    same_class = cls[:, None] == cls[None, :]
+    if var.DUPLICATE_SUPPRESSION == 'iou':
+        top_left = np.maximum(xyxy[:, None, :2], xyxy[None, :, :2])
+        bottom_right = np.minimum(xyxy[:, None, 2:], xyxy[None, :, 2:])
+        intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+        area = np.prod(xyxy[:, 2:] - xyxy[:, :2], axis=1)
+        union = area[:, None] + area[None, :] - intersection
+        close = intersection > var.DUPLICATE_IOU * np.maximum(union, 1e-9)
+    else:
+        close = np.all(np.abs(xywhn[:, None, :2] - xywhn[None, :, :2]) < 0.01, axis=2)
+    duplicates = same_class & close
+
+    # Greedy suppression: a kept box removes its duplicates that are visited later.
+    order = np.argsort(-cls, kind='stable')
+    visit = np.argsort(-conf, kind='stable') if var.DUPLICATE_KEEP == 'confidence' else order
+    keep = np.zeros(len(cls), dtype=bool)
+    suppressed = np.zeros(len(cls), dtype=bool)
+    for index in visit:
+        if suppressed[index]:
+            continue
+        keep[index] = True
+        suppressed |= duplicates[index]
+
+    kept = order[keep[order]]
+    return xywhn[kept], xyxy[kept], cls[kept], conf[kept]
 
 
 def __crop_frame__(frame, combined_results, padding=100):
@@ -101,18 +335,15 @@ def __crop_frame__(frame, combined_results, padding=100):
 
     Args:
         frame: The original frame to be processed.
-        combined_results: List of results detected by models.
+        combined_results: Merged xywhn, xyxy, cls and conf arrays detected by models.
         padding: Add some space padding to the cropped frame to avoid object cutoff.
     """
+    _, xyxy, _, _ = combined_results
     # If the combined result has at least MIN_DETECTIONS boxes found
-    if len(combined_results) >= var.MIN_DETECTIONS:
-        # Initialize bounding box limits
-        x1_min, y1_min, x2_max, y2_max = float('inf'), float('inf'), float('-inf'), float('-inf')
-
-        for _, xyxy, _, _ in combined_results:
-            x1, y1, x2, y2 = xyxy[0]
-            x1_min, y1_min = min(x1_min, x1), min(y1_min, y1)
-            x2_max, y2_max = max(x2_max, x2), max(y2_max, y2)
+    if len(xyxy) >= var.MIN_DETECTIONS:
+        # Union of all bounding boxes
+        x1_min, y1_min = xyxy[:, :2].min(axis=0)
+        x2_max, y2_max = xyxy[:, 2:].max(axis=0)
 
         # Apply padding to the bounding box
         orig_height, orig_width = frame.shape[:2]
@@ -134,29 +365,43 @@ def __transform_labels__(cropped_frame, cropped_coordinate, combined_results):
     Args:
         cropped_frame: The cropped frame to transform labels.
         cropped_coordinate: Cropped coordinate of the frame (in xyxy format)
-        combined_results: List of results detected by models.
+        combined_results: Merged xywhn, xyxy, cls and conf arrays detected by models.
     """
-    labels_and_boxes = ''
+    _, xyxy, cls, _ = combined_results
     frame_height, frame_width = cropped_frame.shape[:2]
 
-    for _, xyxy, cls, conf in combined_results:
-        x1, y1, x2, y2 = xyxy[0]
-        x1, y1, x2, y2 = int(abs(x1 - cropped_coordinate[0])), int(abs(y1 - cropped_coordinate[1])), int(abs(x2 - cropped_coordinate[0])), int(abs(y2 - cropped_coordinate[1]))
-
-        x_center = (x1 + x2) / 2
-        y_center = (y1 + y2) / 2
+    # Box corners in pixels of the cropped frame
+    x1, y1, x2, y2 = __to_cropped_coordinates__(xyxy, cropped_coordinate).T
 
-        # Calculate the xywhn values (requirement for ultralytics YOLO models dataset)
-        x_center_norm = x_center / frame_width
-        y_center_norm = y_center / frame_height
-        width_norm = (x2 - x1) / frame_width
-        height_norm = (y2 - y1) / frame_height
+    # Calculate the xywhn values (requirement for ultralytics YOLO models dataset)
+    x_center_norm = (x1 + x2) / 2 / frame_width
+    y_center_norm = (y1 + y2) / 2 / frame_height
+    width_norm = (x2 - x1) / frame_width
+    height_norm = (y2 - y1) / frame_height
 
-        labels_and_boxes += f'{int(cls)} {x_center_norm} {y_center_norm} {width_norm} {height_norm}\n'
+    labels_and_boxes = ''
+    for label in zip(cls.astype(int).tolist(), x_center_norm.tolist(), y_center_norm.tolist(),
+                     width_norm.tolist(), height_norm.tolist()):
+        labels_and_boxes += '{} {} {} {} {}\n'.format(*label)
 
     return labels_and_boxes
 
 
+def __to_cropped_coordinates__(xyxy, cropped_coordinate):
+    """
+    Convert xyxy boxes of the original frame to integer xyxy boxes of the cropped frame.
+
+    Args:
+        xyxy: Array of boxes in the original frame.
+        cropped_coordinate: Cropped coordinate of the frame (in xyxy format)
+
+    Returns:
+        Array of boxes in the cropped frame.
+    """
+    offset = np.array(cropped_coordinate[:2] * 2)
+    return np.abs(xyxy - offset).astype(int)
+
+
 def __get_labeled_frame__(cropped_frame, cropped_coordinate, cv2, combined_results):
     """
     <Used for testing if you want to see the labeled frame>
@@ -166,16 +411,15 @@ def __get_labeled_frame__(cropped_frame, cropped_coordinate, cv2, combined_resul
         cropped_frame: The cropped frame to transform labels.
         cropped_coordinate: Cropped coordinate of the frame (in xyxy format)
         cv2: The Capture Video agent,
-        combined_results: List of results detected by models.
+        combined_results: Merged xywhn, xyxy, cls and conf arrays detected by models.
     """
+    _, xyxy, cls, _ = combined_results
     labeled_frame = cropped_frame.copy()
-    for _, xyxy, cls, _ in combined_results:
-        x1, y1, x2, y2 = xyxy[0]
-        x1, y1, x2, y2 = int(abs(x1 - cropped_coordinate[0])), int(abs(y1 - cropped_coordinate[1])), int(abs(x2 - cropped_coordinate[0])), int(abs(y2 - cropped_coordinate[1]))
-        print(f"Box: {xyxy}, Class: {int(cls)}")
+    for box, (x1, y1, x2, y2), label in zip(xyxy, __to_cropped_coordinates__(xyxy, cropped_coordinate).tolist(), cls):
+        print(f"Box: {box}, Class: {int(label)}")
         print(f"Width: {x2 - x1} and height: {y2 - y1}")
         cv2.rectangle(labeled_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-        cv2.putText(labeled_frame, f'{int(cls)}', (x1 - 10, y1 - 20),
+        cv2.putText(labeled_frame, f'{int(label)}', (x1 - 10, y1 - 20),
                     cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 255, 0), 2)
 
     return labeled_frame
@@ -1,4 +1,5 @@
 from exports.flat.flat_export import FlatExport
+from exports.shard.shard_export import ShardExport
 from exports.yolov8.yolov8_export import Yolov8Export
 from utils.VariableClass import VariableClass
 
@@ -12,17 +13,22 @@ class ExportFactory:
         self._var = VariableClass()
         self.name = self._var.DATASET_FORMAT
 
-    def init(self):
+    def init(self, worker_id=None):
         """
         Initializes specific export with given name.
 
+        Args:
+            worker_id: Id of the worker using the export, None when a single worker is used.
+
         Returns:
             Initialized corresponding export object.
         """
         if self.name == 'yolov8':
-            return Yolov8Export(self.name)
+            return Yolov8Export(self.name, worker_id)
         elif self.name == 'flat':
-            return FlatExport(self.name)
+            return FlatExport(self.name, worker_id)
+        elif self.name == 'shard':
+            return ShardExport(self.name, worker_id)
         else:
             raise ModuleNotFoundError('Export type not found!')
 
@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class ExportWriter:
+    """
+    Writes the files of an export in background threads, so the encoding of the frames
+    doesn't block the inference loop. At most queue_size writes are pending at once,
+    submitting another write blocks until one of them is finished.
+    """
+
+    def __init__(self, workers=1, queue_size=16):
+        """
+        Constructor.
+
+        Args:
+            workers: Number of threads writing the files, cv2.imwrite releases the GIL while encoding.
+            queue_size: Maximum number of pending writes.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export-writer')
+        self._slots = threading.BoundedSemaphore(max(queue_size, 1))
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors = []
+
+    def submit(self, write, *args):
+        """
+        Write in the background, blocks while the queue is full.
+
+        Args:
+            write: The function writing the files.
+            *args: Arguments of the function.
+        """
+        self._slots.acquire()
+        future = self._executor.submit(write, *args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self.__done__)
+
+    def flush(self):
+        """
+        Wait until all pending writes are finished.
+        Raises the first error of the failed writes since the previous flush.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            print(f'Writing {len(errors)} export file(s) failed: {errors[0]}')
+            raise errors[0]
+
+    def __done__(self, future):
+        """
+        Release the slot of a finished write and keep its error.
+
+        Args:
+            future: The finished write.
+        """
+        with self._lock:
+            self._pending.discard(future)
+            if future.exception() is not None:
+                self._errors.append(future.exception())
+        self._slots.release()
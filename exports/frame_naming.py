@@ -0,0 +1,40 @@
+import itertools
+import os
+import re
+import threading
+import time
+import uuid
+
+# Shared by every export in the process, so concurrent workers never hand out the same number.
+_counter = itertools.count()
+_counter_lock = threading.Lock()
+# The counter restarts in every process, the random process id keeps the names of different runs apart.
+_process_id = uuid.uuid4().hex[:8]
+
+
+def frame_name(media_key=None, frame_number=None):
+    """
+    Unique file name (without extension) of an exported frame.
+    It is built from the media key, the frame number, an id of the process and a monotonic counter within the process,
+    so frames saved within the same second, by concurrent workers or of a video reprocessed later (also after a restart)
+    never overwrite each other.
+
+    Args:
+        media_key: Key of the media in the vault, the current unix time is used when unknown.
+        frame_number: Number of the frame in the video.
+
+    Returns:
+        str: The file name.
+    """
+    with _counter_lock:
+        count = next(_counter)
+
+    if media_key:
+        # Keys contain directories (e.g. camera/recording.mp4), keep them readable within a single file name.
+        source = re.sub(r'[^A-Za-z0-9_.-]+', '_', os.path.splitext(media_key)[0]).strip('_.')
+    else:
+        source = str(int(time.time()))
+
+    if frame_number is None:
+        return f'{source}_{_process_id}_{count:06d}'
+    return f'{source}_{int(frame_number):06d}_{_process_id}_{count:06d}'
@@ -0,0 +1,41 @@
+class ImageCodec:
+    """
+    Image codec of the exported frames, it defines the file extension and the cv2.imwrite parameters.
+    """
+
+    # Extension and the cv2 parameter setting the quality (or compression level) per format.
+    FORMATS = {
+        'png': ('png', 'IMWRITE_PNG_COMPRESSION'),
+        'jpeg': ('jpg', 'IMWRITE_JPEG_QUALITY'),
+        'jpg': ('jpg', 'IMWRITE_JPEG_QUALITY'),
+        'webp': ('webp', 'IMWRITE_WEBP_QUALITY'),
+    }
+
+    def __init__(self, image_format='png', quality=-1):
+        """
+        Constructor.
+
+        Args:
+            image_format: Format of the exported frames: png, jpeg or webp.
+            quality: Quality of jpeg and webp (0-100), compression level of png (0-9), -1 for the OpenCV default.
+        """
+        image_format = image_format.lower()
+        if image_format not in self.FORMATS:
+            raise ValueError(f'Image format {image_format} not supported, use one of {list(self.FORMATS)}')
+
+        self.extension, self._quality_param = self.FORMATS[image_format]
+        self.quality = quality
+
+    def params(self, cv2):
+        """
+        Parameters of cv2.imwrite for this codec.
+
+        Args:
+            cv2: The OpenCV module used to encode the frames.
+
+        Returns:
+            List of parameter ids and values.
+        """
+        if self.quality < 0:
+            return []
+        return [getattr(cv2, self._quality_param), self.quality]
@@ -0,0 +1,49 @@
+from abc import ABC, abstractmethod
+
+
+class IShardExport(ABC):
+    """
+    Interface for Shard Export.
+    """
+
+    @abstractmethod
+    def initialize_save_dir(self):
+        """
+        Initializes save directory for Shard export format
+        """
+        pass
+
+    @abstractmethod
+    def save_frame(self, frame, predicted_frames, cv2, labels_and_boxes, labeled_frame=None,
+                   media_key=None, frame_number=None):
+        """
+        Appends a single frame as well as its predicted annotation to the open tar shard.
+        Both are stored under the same unique name (media key, frame number and a counter),
+        1 image (IMAGE_FORMAT, png by default) for the raw frame and 1 .txt for the annotations.
+        A new shard is started once the open one reaches SHARD_MAX_SIZE.
+
+        Args:
+            frame: The current frame to be saved.
+            predicted_frames: Frames with predictions that might need to be saved alongside the original.
+            cv2: The OpenCV module used for image processing, passed in to avoid tight coupling.
+            labels_and_boxes: A list containing labels and their corresponding bounding boxes for the frame.
+            labeled_frame: The frame with the labels drawn on it, stored in the same sample when given.
+            media_key: Key of the media the frame belongs to, used to name the files.
+            frame_number: Number of the frame in the media, used to name the files.
+        """
+        pass
+
+    @abstractmethod
+    def flush(self):
+        """
+        Waits until the frames handed to save_frame are written, closes the open shard and writes the manifest,
+        raises the error of a failed write. Must be called before the dataset is uploaded.
+        """
+        pass
+
+    @abstractmethod
+    def create_yaml(self, project):
+        """
+        Create .yaml file to map annotation labels with their corresponding names.
+        """
+        pass
@@ -0,0 +1,232 @@
+from exports.export_writer import ExportWriter
+from exports.frame_naming import frame_name
+from exports.image_codec import ImageCodec
+from exports.shard.ishard_export import IShardExport
+from utils.VariableClass import VariableClass
+from os.path import (
+    join as pjoin,
+    dirname as pdirname,
+    abspath as pabspath,
+)
+import io
+import json
+import os
+import re
+import tarfile
+import threading
+import time
+import uuid
+
+
+class ShardExport(IShardExport):
+    """
+    Shard Export class that implements functions for
+    initializing, saving frames into size-capped tar shards and creating yaml file.
+    Every sample of a shard is an image and a .txt label file sharing the same name (WebDataset layout),
+    a manifest lists the shards and the samples they contain.
+    """
+
+    def __init__(self, name, worker_id=None):
+        """
+        Constructor.
+
+        Args:
+            name: Name of the export format.
+            worker_id: Id of the worker using this export, every worker saves under its own directory.
+        """
+        self.name = name
+        self._var = VariableClass()
+        _cur_dir = pdirname(pabspath(__file__))
+        self.proj_dir = pjoin(_cur_dir, f'../../data/{name}')
+        if worker_id is not None:
+            self.proj_dir = pjoin(self.proj_dir, f'worker-{worker_id}')
+        self.proj_dir = pabspath(self.proj_dir)  # normalise the link
+        self.result_dir_path = None
+        self.yaml_path = None
+        self.image_codec = ImageCodec(self._var.IMAGE_FORMAT, self._var.IMAGE_QUALITY)
+        self.max_shard_size = self._var.SHARD_MAX_SIZE * 1024 * 1024
+        # Called with the dataset directory and the paths of every saved file, e.g. to upload them right away.
+        self.saved_callback = None
+        # Write the files in the background when EXPORT_WRITER_WORKERS is set, otherwise in save_frame.
+        self._writer = None
+        if self._var.EXPORT_WRITER_WORKERS > 0:
+            self._writer = ExportWriter(self._var.EXPORT_WRITER_WORKERS, self._var.EXPORT_QUEUE_SIZE)
+        # Frames are encoded concurrently, but appended to the open shard one at a time.
+        self._lock = threading.Lock()
+        self._run_id = None
+        self._shard = None
+        self._shard_path = None
+        self._shard_index = 0
+        self._shard_keys = []
+        self._manifest = []
+
+    def initialize_save_dir(self):
+        """
+        See ishard_export.py
+
+        Returns:
+            Success true or false.
+        """
+        self.result_dir_path = pjoin(self.proj_dir, f'{self._var.DATASET_FORMAT}-v{self._var.DATASET_VERSION}')
+        os.makedirs(self.result_dir_path, exist_ok=True)
+
+        self.yaml_path = pjoin(self.result_dir_path, 'data.yaml')
+
+        # Shards and manifest of every run get a unique name, so uploads never overwrite the ones of another run.
+        with self._lock:
+            self._run_id = f'{int(time.time())}-{uuid.uuid4().hex[:8]}'
+            self._shard_index = 0
+            self._manifest = []
+
+        if os.path.exists(self.result_dir_path):
+            print('Successfully initialize save directory!')
+            return True
+        else:
+            print('Something wrong happened!')
+            return False
+
+    def save_frame(self, frame, predicted_frames, cv2, labels_and_boxes, labeled_frame=None,
+                   media_key=None, frame_number=None):
+        """
+        See ishard_export.py
+
+        Returns:
+            Predicted frame counter.
+        """
+        print(f'5.1. Condition met, processing valid frame: {predicted_frames}')
+        print("5.2. Saving frame, labels and boxes")
+        # WebDataset splits the sample key from the extension at the first dot, keep dots out of the key.
+        key = re.sub(r'[^A-Za-z0-9_-]', '_', frame_name(media_key, frame_number))
+        sample = (cv2, key, frame, labels_and_boxes, labeled_frame)
+        if self._writer:
+            self._writer.submit(self.__write_sample__, *sample)
+        else:
+            self.__write_sample__(*sample)
+
+        # Increase the frame_number and predicted_frames by one.
+        return predicted_frames + 1
+
+    def flush(self):
+        """
+        See ishard_export.py
+
+        Returns:
+            None
+        """
+        try:
+            if self._writer:
+                self._writer.flush()
+        finally:
+            with self._lock:
+                self.__close_shard__()
+                self.__write_manifest__()
+
+    def create_yaml(self, project):
+        """
+        Create YAML configuration file with the class names.
+        As convention, class names of YAML file is configured based on the first model
+
+        Returns:
+            None
+        """
+        model = project.models[0]
+
+        label_names = [name for name in list(model.names.values())]
+        with open(self.yaml_path, 'w') as my_file:
+            content = 'names:\n'
+            for name in label_names:
+                content += f'- {name}\n'
+            content += f'path: ./\n'
+            content += f'shards: ./shard-*.tar\n'
+            my_file.write(content)
+
+    def __write_sample__(self, cv2, name, frame, labels_and_boxes, labeled_frame):
+        """
+        Encode a sample and append it to the open shard, the shard is closed when it reaches the maximum size.
+
+        Args:
+            cv2: The OpenCV module used to encode the frames.
+            name: Name of the sample.
+            frame: The frame to be saved.
+            labels_and_boxes: The labels and boxes of the frame.
+            labeled_frame: The labeled frame, None to skip it.
+        """
+        extension, params = self.image_codec.extension, self.image_codec.params(cv2)
+        members = [(f'{name}.{extension}', self.__encode__(cv2, extension, frame, params))]
+        if labeled_frame is not None:
+            members.append((f'{name}.labeled.{extension}', self.__encode__(cv2, extension, labeled_frame, params)))
+        members.append((f'{name}.txt', labels_and_boxes.encode()))
+
+        with self._lock:
+            if self._shard is None:
+                self.__open_shard__()
+
+            for member_name, data in members:
+                info = tarfile.TarInfo(member_name)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                self._shard.addfile(info, io.BytesIO(data))
+            self._shard_keys.append(name)
+
+            if self._shard.fileobj.tell() >= self.max_shard_size:
+                self.__close_shard__()
+
+    @staticmethod
+    def __encode__(cv2, extension, frame, params):
+        """
+        Encode a frame in memory.
+
+        Returns:
+            bytes: The encoded image.
+        """
+        success, encoded = cv2.imencode(f'.{extension}', frame, params)
+        if not success:
+            raise IOError(f'Could not encode frame as {extension}')
+        return encoded.tobytes()
+
+    def __open_shard__(self):
+        """
+        Open the next shard. It is written as .tar.part and only renamed to .tar once it is complete.
+        """
+        self._shard_path = pjoin(self.result_dir_path, f'shard-{self._run_id}-{self._shard_index:06d}.tar')
+        # PAX headers, ustar limits member names to 100 characters and media keys of Kerberos Vault are longer.
+        self._shard = tarfile.open(f'{self._shard_path}.part', 'w', format=tarfile.PAX_FORMAT)
+        self._shard_index += 1
+        self._shard_keys = []
+
+    def __close_shard__(self):
+        """
+        Close the open shard, if any, add it to the manifest and report it to the saved_callback.
+        """
+        if self._shard is None:
+            return
+
+        self._shard.close()
+        os.replace(f'{self._shard_path}.part', self._shard_path)
+        self._manifest.append({
+            'shard': os.path.basename(self._shard_path),
+            'size': os.path.getsize(self._shard_path),
+            'samples': len(self._shard_keys),
+            'keys': self._shard_keys,
+        })
+        if self.saved_callback:
+            self.saved_callback(self.result_dir_path, [self._shard_path])
+        self._shard = None
+        self._shard_keys = []
+
+    def __write_manifest__(self):
+        """
+        Write the manifest of the shards closed in this run.
+        """
+        if not self._manifest:
+            return
+
+        manifest_path = pjoin(self.result_dir_path, f'manifest-{self._run_id}.json')
+        with open(f'{manifest_path}.part', 'w') as my_file:
+            json.dump({
+                'format': self.name,
+                'version': self._var.DATASET_VERSION,
+                'image_format': self.image_codec.extension,
+                'shards': self._manifest,
+            }, my_file, indent=2)
+        os.replace(f'{manifest_path}.part', manifest_path)
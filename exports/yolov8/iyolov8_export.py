@@ -13,11 +13,12 @@ class IYolov8Export(ABC):
         pass
 
     @abstractmethod
-    def save_frame(self, frame, predicted_frames, cv2, labels_and_boxes):
+    def save_frame(self, frame, predicted_frames, cv2, labels_and_boxes, labeled_frame=None,
+                   media_key=None, frame_number=None):
         """
         Saves a single frames as well as it predicted annotation.
-        It should save 2 separate files under the same name,
-            - 1 .png for the raw frame and is saved in images subdirectory.
+        It should save 2 separate files under the same unique name (media key, frame number and a counter),
+            - 1 image (IMAGE_FORMAT, png by default) for the raw frame and is saved in images subdirectory.
             - 1 .txt for the annotations and is saved in labels subdirectory.
 
         Args:
@@ -25,6 +26,17 @@ class IYolov8Export(ABC):
             predicted_frames: Frames with predictions that might need to be saved alongside the original.
             cv2: The OpenCV module used for image processing, passed in to avoid tight coupling.
             labels_and_boxes: A list containing labels and their corresponding bounding boxes for the frame.
+            labeled_frame: The frame with the labels drawn on it, saved in a separate directory when given.
+            media_key: Key of the media the frame belongs to, used to name the files.
+            frame_number: Number of the frame in the media, used to name the files.
+        """
+        pass
+
+    @abstractmethod
+    def flush(self):
+        """
+        Waits until the frames handed to save_frame are written,
+        raises the error of a failed write. Must be called before the dataset is uploaded.
         """
         pass
 
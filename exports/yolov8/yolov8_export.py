@@ -1,3 +1,6 @@
+from exports.export_writer import ExportWriter
+from exports.frame_naming import frame_name
+from exports.image_codec import ImageCodec
 from exports.yolov8.iyolov8_export import IYolov8Export
 from utils.VariableClass import VariableClass
 from os.path import (
@@ -6,7 +9,6 @@ from os.path import (
     abspath as pabspath,
 )
 import os
-import time
 
 
 class Yolov8Export(IYolov8Export):
@@ -15,20 +17,33 @@ class Yolov8Export(IYolov8Export):
     initializing, saving frame and creating yaml file under specific format.
     """
 
-    def __init__(self, name):
+    def __init__(self, name, worker_id=None):
         """
         Constructor.
+
+        Args:
+            name: Name of the export format.
+            worker_id: Id of the worker using this export, every worker saves under its own directory.
         """
         self.name = name
         self._var = VariableClass()
         _cur_dir = pdirname(pabspath(__file__))
         self.proj_dir = pjoin(_cur_dir, f'../../data/{name}')
+        if worker_id is not None:
+            self.proj_dir = pjoin(self.proj_dir, f'worker-{worker_id}')
         self.proj_dir = pabspath(self.proj_dir)  # normalise the link
         self.image_dir_path = None
         self.label_dir_path = None
         self.yaml_path = None
         self.result_dir_path = None
         self.result_labeled_dir_path = None
+        self.image_codec = ImageCodec(self._var.IMAGE_FORMAT, self._var.IMAGE_QUALITY)
+        # Called with the dataset directory and the paths of every saved file, e.g. to upload them right away.
+        self.saved_callback = None
+        # Write the files in the background when EXPORT_WRITER_WORKERS is set, otherwise in save_frame.
+        self._writer = None
+        if self._var.EXPORT_WRITER_WORKERS > 0:
+            self._writer = ExportWriter(self._var.EXPORT_WRITER_WORKERS, self._var.EXPORT_QUEUE_SIZE)
 
     def initialize_save_dir(self):
         """
@@ -60,7 +75,8 @@ class Yolov8Export(IYolov8Export):
             print('Something wrong happened!')
             return False
 
-    def save_frame(self, frame, predicted_frames, cv2, labels_and_boxes, labeled_frame=None):
+    def save_frame(self, frame, predicted_frames, cv2, labels_and_boxes, labeled_frame=None,
+                   media_key=None, frame_number=None):
         """
         See iyolov8_export.py
 
@@ -69,25 +85,61 @@ class Yolov8Export(IYolov8Export):
         """
         print(f'5.1. Condition met, processing valid frame: {predicted_frames}')
         # Save original frame
-        unix_time = int(time.time())
+        name = frame_name(media_key, frame_number)
         print("5.2. Saving frame, labels and boxes")
-        cv2.imwrite(
-            f'{self.image_dir_path}/{unix_time}.png',
-            frame)
-
+        labeled_frame_path = None
         if labeled_frame is not None:
             os.makedirs(self.result_labeled_dir_path, exist_ok=True)
+            labeled_frame_path = f'{self.result_labeled_dir_path}/{name}.{self.image_codec.extension}'
+
+        files = (cv2, self.image_codec.params(cv2),
+                 f'{self.image_dir_path}/{name}.{self.image_codec.extension}', frame,
+                 f'{self.label_dir_path}/{name}.txt', labels_and_boxes,
+                 labeled_frame_path, labeled_frame)
+        if self._writer:
+            self._writer.submit(self.__write_files__, *files)
+        else:
+            self.__write_files__(*files)
+
+        # Increase the frame_number and predicted_frames by one.
+        return predicted_frames + 1
 
-            cv2.imwrite(
-                f'{self.result_labeled_dir_path}/{unix_time}.png',
-                labeled_frame)
+    def flush(self):
+        """
+        See iyolov8_export.py
+
+        Returns:
+            None
+        """
+        if self._writer:
+            self._writer.flush()
+
+    def __write_files__(self, cv2, params, frame_path, frame, label_path, labels_and_boxes, labeled_frame_path, labeled_frame):
+        """
+        Write the frame, its labels and boxes, and optionally the labeled frame.
+        The frame and its labels are reported to the saved_callback, the labeled frame is not part of the dataset.
+
+        Args:
+            cv2: The OpenCV module used to encode the frames.
+            params: The cv2.imwrite parameters of the image codec.
+            frame_path: Path of the frame.
+            frame: The frame to be saved.
+            label_path: Path of the labels and boxes.
+            labels_and_boxes: The labels and boxes of the frame.
+            labeled_frame_path: Path of the labeled frame.
+            labeled_frame: The labeled frame, None to skip it.
+        """
+        if not cv2.imwrite(frame_path, frame, params):
+            raise IOError(f'Could not write frame {frame_path}')
+
+        if labeled_frame is not None:
+            cv2.imwrite(labeled_frame_path, labeled_frame, params)
         # Save labels and boxes
-        with open(f'{self.label_dir_path}/{unix_time}.txt',
-                  'w') as my_file:
+        with open(label_path, 'w') as my_file:
             my_file.write(labels_and_boxes)
 
-        # Increase the frame_number and predicted_frames by one.
-        return predicted_frames + 1
+        if self.saved_callback:
+            self.saved_callback(self.result_dir_path, [frame_path, label_path])
 
     def create_yaml(self, project):
         """
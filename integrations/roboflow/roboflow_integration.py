@@ -1,8 +1,19 @@
+import os
 import shutil
-from os.path import basename as pbasename
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from os.path import (
+    basename as pbasename,
+    join as pjoin,
+    dirname as pdirname,
+    abspath as pabspath,
+)
 
 import roboflow
 
+from integrations.upload_journal import UploadJournal
 from utils.VariableClass import VariableClass
 
 
@@ -12,6 +23,8 @@ class RoboflowIntegration:
     to Roboflow platform.
     """
 
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
     def __init__(self, name):
         """
         Constructor.
@@ -19,26 +32,247 @@ class RoboflowIntegration:
         self._var = VariableClass()
         self.agent, self.ws, self.project = self.__connect__()
         self.name = name
+        # Records the uploaded images, so they are skipped after a restart and never uploaded twice.
+        self.journal = UploadJournal(self._var.UPLOAD_JOURNAL) if self._var.UPLOAD_JOURNAL else None
+        self.target = f'roboflow://{self.project.id}'
+
+        # With ROBOFLOW_BATCH_SIZE, the datasets of several videos are collected in the batch directory
+        # and uploaded together. A full batch is moved into the uploading directory, so new datasets can be
+        # added while it uploads. Images left over from a previous run are part of the next batch.
+        _cur_dir = pdirname(pabspath(__file__))
+        self.batch_dir = pabspath(pjoin(_cur_dir, '../../data/roboflow-batch'))
+        self.uploading_dir = pabspath(pjoin(_cur_dir, '../../data/roboflow-uploading'))
+        self._batch_lock = threading.Lock()
+        if os.path.isdir(self.uploading_dir):
+            for batch_name in os.listdir(self.uploading_dir):
+                self.__move_files__(pjoin(self.uploading_dir, batch_name), self.batch_dir)
+        self._pending_images = len(self.__find_images__(self.batch_dir))
+        # Throughput and failures of every uploaded batch, and the totals over all batches.
+        self.batch_metrics = []
+        self.metrics = {'batches': 0, 'uploaded': 0, 'failed': 0}
 
     def upload_dataset(self, src_project_path):
         """
         See iroboflow_integration.py
         """
+        if self._var.ROBOFLOW_BATCH_SIZE > 0:
+            self.__add_to_batch__(src_project_path)
+            return
+
+        if self.journal:
+            # ws.upload_dataset does not report which images failed, so every image is uploaded on its own
+            # and only journaled once Roboflow confirms it. Failed images are kept in the dataset.
+            uploaded = self.__upload_images__(src_project_path, None)
+            if uploaded.count(False):
+                print(f'Failed to upload {uploaded.count(False)} images to Roboflow, they are kept in {src_project_path}')
+                return
+            print('Uploaded')
+            shutil.rmtree(src_project_path)
+            return
+
         # Upload data set to an existing project
-        self.ws.upload_dataset(
-            src_project_path,
-            pbasename(self.project.id),
-            num_workers=10,
-            project_license="MIT",
-            project_type="object-detection",
-            batch_name=None,
-            num_retries=0
-        )
+        try:
+            self.ws.upload_dataset(
+                src_project_path,
+                pbasename(self.project.id),
+                num_workers=self._var.ROBOFLOW_UPLOAD_WORKERS,
+                project_license="MIT",
+                project_type="object-detection",
+                batch_name=None,
+                num_retries=self._var.ROBOFLOW_UPLOAD_RETRIES
+            )
+        except Exception as e:
+            print(f'Failed to upload {src_project_path} to Roboflow, the dataset is kept: {e}')
+            return
         print('Uploaded')
 
         # Remove local folder when uploaded
         shutil.rmtree(src_project_path)
 
+    def __add_to_batch__(self, src_project_path):
+        """
+        Move a dataset into the batch directory, and upload the batch once it holds ROBOFLOW_BATCH_SIZE images.
+
+        Args:
+            src_project_path: Project save path
+        """
+        with self._batch_lock:
+            self._pending_images += len(self.__find_images__(src_project_path))
+            self.__move_files__(src_project_path, self.batch_dir)
+
+            if self._pending_images < self._var.ROBOFLOW_BATCH_SIZE:
+                print(f'{self._pending_images} images waiting for the next Roboflow batch')
+                return
+
+            # Take the batch out of the batch directory, the upload itself runs without holding the lock.
+            batch_name = f'data-harvesting-{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+            upload_dir = pjoin(self.uploading_dir, batch_name)
+            os.makedirs(self.uploading_dir, exist_ok=True)
+            os.rename(self.batch_dir, upload_dir)
+            self._pending_images = 0
+
+        self.__upload_batch__(upload_dir, batch_name)
+
+    def __upload_batch__(self, upload_dir, batch_name):
+        """
+        Upload the images of a batch concurrently, every image is retried ROBOFLOW_UPLOAD_RETRIES times.
+        Uploaded images are removed, failed images are moved back into the batch directory for the next batch.
+
+        Args:
+            upload_dir: Directory holding the batch.
+            batch_name: Name of the Roboflow batch.
+        """
+        start_time = time.time()
+        uploaded = self.__upload_images__(upload_dir, batch_name)
+        duration = time.time() - start_time
+
+        metrics = {
+            'batch': batch_name,
+            'images': len(uploaded),
+            'uploaded': uploaded.count(True),
+            'failed': uploaded.count(False),
+            'seconds': round(duration, 3),
+            'images_per_second': round(uploaded.count(True) / duration, 3) if duration > 0 else 0.0,
+        }
+        with self._batch_lock:
+            self.__move_files__(upload_dir, self.batch_dir)
+            self._pending_images += metrics['failed']
+            self.batch_metrics.append(metrics)
+            self.metrics['batches'] += 1
+            self.metrics['uploaded'] += metrics['uploaded']
+            self.metrics['failed'] += metrics['failed']
+
+        print(f'Uploaded Roboflow batch {batch_name}: {metrics["uploaded"]}/{metrics["images"]} images '
+              f'in {metrics["seconds"]:.1f}s ({metrics["images_per_second"]:.2f} images/s), '
+              f'{metrics["failed"]} failed and kept for the next batch')
+
+    def __upload_images__(self, upload_dir, batch_name):
+        """
+        Upload the images of a directory concurrently, with ROBOFLOW_UPLOAD_WORKERS threads.
+
+        Args:
+            upload_dir: Directory holding the images, their labels and the data.yaml.
+            batch_name: Name of the Roboflow batch, None for the default batch.
+
+        Returns:
+            List of True (uploaded) or False (failed) for every image.
+        """
+        images = self.__find_images__(upload_dir)
+        labelmap = pjoin(upload_dir, 'data.yaml')
+        labelmap = labelmap if os.path.exists(labelmap) else None
+
+        with ThreadPoolExecutor(max_workers=max(self._var.ROBOFLOW_UPLOAD_WORKERS, 1)) as executor:
+            return list(executor.map(
+                lambda image: self.__upload_image__(upload_dir, image[0], image[1], labelmap, batch_name), images))
+
+    def __upload_image__(self, upload_dir, image_path, label_paths, labelmap, batch_name):
+        """
+        Upload a single image with its annotation, and remove both when uploaded.
+
+        Args:
+            upload_dir: Directory holding the batch of the image.
+            image_path: Path of the image.
+            label_paths: Paths of the label files of the image, the first one is uploaded as annotation.
+            labelmap: Path of the data.yaml mapping the class ids to names, None if there is none.
+            batch_name: Name of the Roboflow batch.
+
+        Returns:
+            True if the image is uploaded, otherwise False.
+        """
+        destination = os.path.relpath(image_path, upload_dir)
+        content_hash = None
+        if self.journal:
+            content_hash = self.journal.file_hash(image_path)
+            if self.journal.uploaded_destination(self.target, content_hash):
+                print(f'Skipped {image_path}, already uploaded')
+                for path in [image_path] + label_paths:
+                    os.remove(path)
+                return True
+
+        try:
+            response = self.project.single_upload(
+                image_path=image_path,
+                annotation_path=label_paths[0] if label_paths else None,
+                annotation_labelmap=labelmap,
+                num_retry_uploads=self._var.ROBOFLOW_UPLOAD_RETRIES,
+                batch_name=batch_name)
+            # Depending on the roboflow version, a rejected upload is returned instead of raised.
+            error = self.__upload_error__(response, annotated=bool(label_paths))
+            if error:
+                raise Exception(error)
+        except Exception as e:
+            print(f'Failed to upload {image_path} to Roboflow: {e}')
+            if self.journal:
+                self.journal.record(self.target, content_hash, destination, UploadJournal.FAILED)
+            return False
+
+        if self.journal:
+            self.journal.record(self.target, content_hash, destination, UploadJournal.UPLOADED)
+        for path in [image_path] + label_paths:
+            os.remove(path)
+        return True
+
+    @staticmethod
+    def __upload_error__(response, annotated):
+        """
+        Find the error in the response of Project.single_upload.
+
+        Args:
+            response: The response, {"error": ...} or {"image": {...}, "annotation": {...}}.
+            annotated: Whether an annotation was uploaded with the image.
+
+        Returns:
+            The error, None if the image (and its annotation) are uploaded.
+        """
+        if not isinstance(response, dict):
+            return f'unexpected response {response!r}'
+        if response.get('error'):
+            return response['error']
+        image = response.get('image')
+        if not isinstance(image, dict) or image.get('error') or not image.get('id'):
+            return f'image not uploaded: {image!r}'
+        annotation = response.get('annotation')
+        if annotated and (not isinstance(annotation, dict) or annotation.get('error')):
+            return f'annotation not uploaded: {annotation!r}'
+        return None
+
+    def __move_files__(self, src_dir, dst_dir):
+        """
+        Move the files of a directory into another directory, keeping their relative paths, and remove the source.
+
+        Args:
+            src_dir: Source directory.
+            dst_dir: Destination directory.
+        """
+        for root, dirs, files in os.walk(src_dir):
+            for filename in files:
+                source_path = pjoin(root, filename)
+                destination_path = pjoin(dst_dir, os.path.relpath(source_path, src_dir))
+                os.makedirs(pdirname(destination_path), exist_ok=True)
+                shutil.move(source_path, destination_path)
+        shutil.rmtree(src_dir)
+
+    def __find_images__(self, src_project_path):
+        """
+        Find the images of a dataset and their label files, which share the name of the image.
+
+        Args:
+            src_project_path: Project save path
+
+        Returns:
+            List of (image path, list of label paths).
+        """
+        images, labels = [], {}
+        for root, dirs, files in os.walk(src_project_path):
+            for filename in files:
+                stem, extension = os.path.splitext(filename)
+                if extension.lower() in self.IMAGE_EXTENSIONS:
+                    images.append(pjoin(root, filename))
+                elif extension.lower() == '.txt':
+                    labels.setdefault(stem, []).append(pjoin(root, filename))
+
+        return [(image_path, labels.get(os.path.splitext(pbasename(image_path))[0], [])) for image_path in images]
+
     def __connect__(self):
         """
         Connect to Roboflow agent.
@@ -15,3 +15,17 @@ class IS3Integration(ABC):
             src_project_path: Project save path
         """
         pass
+
+    @abstractmethod
+    def upload_files(self, src_project_path, source_paths):
+        """
+        Start uploading files of a dataset in the background, a file is removed once it is uploaded.
+
+        Args:
+            src_project_path: Project save path, the files keep their path relative to it.
+            source_paths: Paths of the files to upload.
+
+        Returns:
+            List of futures, their result is True if the file is uploaded, otherwise False.
+        """
+        pass
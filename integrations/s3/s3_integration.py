@@ -1,6 +1,14 @@
 import boto3
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from integrations.upload_journal import UploadJournal
 from utils.VariableClass import VariableClass
 
 
@@ -10,6 +18,12 @@ class S3Integration:
     to S3 compatible platform.
     """
 
+    # Number of parts of a single file that are uploaded at once.
+    TRANSFER_CONCURRENCY = 4
+    # Throttling and timeout errors that S3 compatible platforms return with a 4xx status.
+    TRANSIENT_ERROR_CODES = ('Throttling', 'ThrottlingException', 'SlowDown', 'RequestTimeout',
+                             'RequestLimitExceeded', 'TooManyRequestsException')
+
     def __init__(self, name):
         """
         Constructor.
@@ -19,31 +33,49 @@ class S3Integration:
         self.session, self.agent = self.__connect__()
         self.bucket = self._var.S3_BUCKET
         self.__check_bucket_exists__(self.bucket)
+        # Large files (e.g. tar shards) are uploaded in parts, several parts at once.
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self._var.S3_MULTIPART_THRESHOLD * 1024 * 1024,
+            multipart_chunksize=self._var.S3_MULTIPART_CHUNKSIZE * 1024 * 1024,
+            max_concurrency=self.TRANSFER_CONCURRENCY)
+        # Records the uploaded files, so they are skipped after a restart and identical content is copied in the bucket.
+        self.journal = UploadJournal(self._var.UPLOAD_JOURNAL) if self._var.UPLOAD_JOURNAL else None
+        self.target = f's3://{self.bucket}'
+        # Shared by all datasets, also when several workers upload at the same time.
+        self._executor = ThreadPoolExecutor(max_workers=max(self._var.S3_UPLOAD_WORKERS, 1),
+                                            thread_name_prefix='s3-upload')
 
     def upload_dataset(self, src_project_path):
         """
         See is3_integration.py
         """
         # Iterate over all the files in the folder, including sub folders
+        source_paths = []
         for root, dirs, files in os.walk(src_project_path):
             for filename in files:
                 # Construct the full file path
-                source_path = os.path.join(root, filename)
+                source_paths.append(os.path.join(root, filename))
 
-                # Preserve the folder structure in the S3 path
-                # Create the relative path from the source folder to the current file
-                relative_path = os.path.relpath(source_path, src_project_path)
+        # Upload the files concurrently, a file is only removed after it is uploaded successfully.
+        uploaded = [upload.result() for upload in self.upload_files(src_project_path, source_paths)]
+        failed = uploaded.count(False)
+        if failed:
+            print(f'Failed to upload {failed} of {len(uploaded)} files, they are kept in {src_project_path}')
 
-                # Construct the output path using DATASET_FORMAT and DATASET_VERSION, including the relative path
-                output_path = f"{self._var.DATASET_FORMAT}-v{self._var.DATASET_VERSION}/{relative_path.replace(os.sep, '/')}"
-
-                # Upload the file
-                self.__upload_file__(source_path, output_path)
-                print(
-                    f'Uploaded: {source_path} to s3://{self.bucket}/{output_path}')
+    def upload_files(self, src_project_path, source_paths):
+        """
+        See is3_integration.py
+        """
+        uploads = []
+        for source_path in source_paths:
+            # Preserve the folder structure in the S3 path
+            # Create the relative path from the source folder to the current file
+            relative_path = os.path.relpath(source_path, src_project_path)
 
-                # Remove the file after uploading
-                os.remove(source_path)
+            # Construct the output path using DATASET_FORMAT and DATASET_VERSION, including the relative path
+            output_path = f"{self._var.DATASET_FORMAT}-v{self._var.DATASET_VERSION}/{relative_path.replace(os.sep, '/')}"
+            uploads.append(self._executor.submit(self.__upload_file__, source_path, output_path))
+        return uploads
 
     def __connect__(self):
         """
@@ -56,11 +88,16 @@ class S3Integration:
         """
         session = boto3.session.Session()
         # Connect to S3 Compatible
+        # The client is thread safe, its connection pool is sized for all concurrent uploads.
         agent = session.client(
             self._var.INTEGRATION_NAME,
             endpoint_url=self._var.S3_ENDPOINT,
             aws_access_key_id=self._var.S3_ACCESS_KEY,
             aws_secret_access_key=self._var.S3_SECRET_KEY,
+            # Failed requests are not retried by botocore, __upload_file__ retries them S3_MAX_ATTEMPTS times.
+            config=Config(
+                max_pool_connections=max(self._var.S3_UPLOAD_WORKERS, 1) * self.TRANSFER_CONCURRENCY,
+                retries={'mode': 'standard', 'total_max_attempts': 1}),
         )
         print('Connected!')
 
@@ -68,19 +105,90 @@ class S3Integration:
 
     def __upload_file__(self, source_path, output_path):
         """
-        Upload a single file to S3 compatible platform.
+        Upload a single file to S3 compatible platform and remove it when uploaded.
+        Transient errors are retried up to S3_MAX_ATTEMPTS times with an exponential backoff.
+        With an upload journal, files already uploaded to output_path are skipped,
+        and content already uploaded elsewhere in the bucket is copied instead of uploaded again.
 
         Args:
             source_path: File save path
             output_path: Desired path we want to save in S3
+
+        Returns:
+            True if the file is uploaded, otherwise False.
         """
-        try:
-            self.agent.upload_file(source_path, self.bucket, output_path)
+        content_hash, copy_source = None, None
+        if self.journal:
+            content_hash = self.journal.file_hash(source_path)
+            if self.journal.is_uploaded(self.target, content_hash, output_path):
+                print(f"Skipped '{source_path}', already uploaded to 's3://{self.bucket}/{output_path}'")
+                os.remove(source_path)
+                return True
+            copy_source = self.journal.uploaded_destination(self.target, content_hash)
+            self.journal.record(self.target, content_hash, output_path, UploadJournal.UPLOADING)
+
+        attempts = max(self._var.S3_MAX_ATTEMPTS, 1)
+        for attempt in range(1, attempts + 1):
+            try:
+                self.__transfer_file__(source_path, output_path, copy_source)
+            except Exception as e:
+                if attempt == attempts or not self.__is_transient__(e):
+                    print(
+                        f"Failed to upload '{source_path}' to 's3://{self.bucket}/{output_path}': {e}")
+                    if self.journal:
+                        self.journal.record(self.target, content_hash, output_path, UploadJournal.FAILED)
+                    return False
+                time.sleep(self._var.S3_RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                continue
+
             print(
                 f"Successfully uploaded '{source_path}' to 's3://{self.bucket}/{output_path}'")
-        except Exception as e:
-            print(
-                f"Failed to upload '{source_path}' to 's3://{self.bucket}/{output_path}': {e}")
+            if self.journal:
+                self.journal.record(self.target, content_hash, output_path, UploadJournal.UPLOADED)
+            # Remove the file after uploading
+            os.remove(source_path)
+            return True
+
+        return False
+
+    def __transfer_file__(self, source_path, output_path, copy_source=None):
+        """
+        Upload a file, or copy the object with the same content within the bucket.
+
+        Args:
+            source_path: File save path
+            output_path: Desired path we want to save in S3
+            copy_source: Path in S3 of an object with the same content, None to upload the file.
+        """
+        if copy_source:
+            try:
+                self.agent.copy_object(Bucket=self.bucket, Key=output_path,
+                                       CopySource={'Bucket': self.bucket, 'Key': copy_source})
+                return
+            except ClientError as e:
+                # The object was removed from the bucket since it was uploaded, upload the file instead.
+                if e.response.get('ResponseMetadata', {}).get('HTTPStatusCode') != 404:
+                    raise
+        self.agent.upload_file(source_path, self.bucket, output_path, Config=self.transfer_config)
+
+    @staticmethod
+    def __is_transient__(error):
+        """
+        Check if a failed upload might succeed when it is retried.
+
+        Args:
+            error: The error of the upload.
+
+        Returns:
+            False for client errors (4xx, except timeouts and throttling) and local file errors, otherwise True.
+        """
+        # boto3 wraps the ClientError of a failed transfer in an S3UploadFailedError.
+        client_error = error if isinstance(error, ClientError) else error.__context__
+        if isinstance(client_error, ClientError):
+            status = client_error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 500)
+            code = client_error.response.get('Error', {}).get('Code')
+            return status >= 500 or status in (408, 429) or code in S3Integration.TRANSIENT_ERROR_CODES
+        return not isinstance(error, OSError) or isinstance(error, (ConnectionError, TimeoutError))
 
     def __check_bucket_exists__(self, bucket_name):
         """
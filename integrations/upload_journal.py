@@ -0,0 +1,109 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class UploadJournal:
+    """
+    On-disk journal of uploaded dataset files, stored in SQLite.
+    Every file is recorded by its content hash and destination with the status of its upload,
+    so a restarted pod skips the files that were already uploaded before it died.
+    """
+
+    UPLOADING = 'uploading'
+    UPLOADED = 'uploaded'
+    FAILED = 'failed'
+
+    def __init__(self, path):
+        """
+        Constructor.
+
+        Args:
+            path: Path of the SQLite database, it is created if it doesn't exist.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        # A single connection shared by all upload threads, guarded by the lock.
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS uploads ('
+                'target TEXT NOT NULL, '
+                'destination TEXT NOT NULL, '
+                'hash TEXT NOT NULL, '
+                'status TEXT NOT NULL, '
+                'updated REAL NOT NULL, '
+                'PRIMARY KEY (target, destination, hash))')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS uploads_hash ON uploads (target, hash, status)')
+
+    @staticmethod
+    def file_hash(path, chunk_size=1024 * 1024):
+        """
+        Content hash of a file.
+
+        Args:
+            path: Path of the file.
+            chunk_size: Number of bytes read at once.
+
+        Returns:
+            str: The sha256 hex digest.
+        """
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def is_uploaded(self, target, content_hash, destination):
+        """
+        Check if content is uploaded to a destination.
+
+        Args:
+            target: The upload target, e.g. the bucket or project.
+            content_hash: Content hash of the file.
+            destination: Destination of the file in the target.
+
+        Returns:
+            bool: True if the content is uploaded to the destination.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT 1 FROM uploads WHERE target = ? AND destination = ? AND hash = ? AND status = ?',
+                (target, destination, content_hash, self.UPLOADED)).fetchone()
+        return row is not None
+
+    def uploaded_destination(self, target, content_hash):
+        """
+        Find any destination the content is uploaded to, to deduplicate uploads of the same content.
+
+        Args:
+            target: The upload target, e.g. the bucket or project.
+            content_hash: Content hash of the file.
+
+        Returns:
+            str or None: The destination, None if the content is not uploaded.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT destination FROM uploads WHERE target = ? AND hash = ? AND status = ? LIMIT 1',
+                (target, content_hash, self.UPLOADED)).fetchone()
+        return row[0] if row else None
+
+    def record(self, target, content_hash, destination, status):
+        """
+        Record the status of an upload.
+
+        Args:
+            target: The upload target, e.g. the bucket or project.
+            content_hash: Content hash of the file.
+            destination: Destination of the file in the target.
+            status: One of UPLOADING, UPLOADED or FAILED.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO uploads (target, destination, hash, status, updated) VALUES (?, ?, ?, ?, ?)',
+                (target, destination, content_hash, status, time.time()))
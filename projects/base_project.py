@@ -5,11 +5,18 @@ from os.path import (
     basename as pbasename
 )
 from projects.ibase_project import IBaseProject
+from utils.InferenceRegion import InferenceRegion
 from utils.VariableClass import VariableClass
 from ultralytics import YOLO
+from ultralytics.utils import callbacks
 
+from collections import Counter
+
+import copy
+import numpy as np
 import yaml
 import os
+import time
 import torch
 
 
@@ -18,6 +25,9 @@ class BaseProject(IBaseProject):
     Base Project that implements common functions, every project should inherit this.
     """
 
+    # Inference backends of the models, see the backend option of the project configuration.
+    BACKENDS = ('pytorch', 'onnx', 'openvino')
+
     def __init__(self):
         """
         Constructor.
@@ -29,6 +39,12 @@ class BaseProject(IBaseProject):
         self.mapping = None
         self.device = None
         self.models = []
+        # Region of the frames the models predict, see the roi and tiles options of the project configuration.
+        self.inference_region = None
+        # Time in seconds the last reset_models call took.
+        self.reset_time = 0
+        # Number of frames rejected after every stage (model index) of the cascade, see stage_condition.
+        self.stage_rejections = Counter()
 
     def condition_func(self, total_results):
         """
@@ -42,6 +58,59 @@ class BaseProject(IBaseProject):
         """
         raise NotImplemented('Should override this!!!')
 
+    def stage_condition(self, stage, partial_results):
+        """
+        See ibase_project.py
+        """
+        # By default a frame is only rejected when a model has no detections at all.
+        return len(partial_results[stage]) > 0
+
+    @staticmethod
+    def has_class(boxes, class_id):
+        """
+        Check if any box belongs to class_id, evaluated on the whole boxes.cls tensor at once.
+
+        Args:
+            boxes: The boxes of a result (ultralytics Boxes).
+            class_id: The class to look for.
+
+        Returns:
+            bool: True if at least one box has class_id.
+        """
+        return bool((boxes.cls == class_id).any())
+
+    @staticmethod
+    def count_class(boxes, class_id):
+        """
+        Count the boxes that belong to class_id, evaluated on the whole boxes.cls tensor at once.
+
+        Args:
+            boxes: The boxes of a result (ultralytics Boxes).
+            class_id: The class to count.
+
+        Returns:
+            int: Number of boxes with class_id.
+        """
+        return int((boxes.cls == class_id).sum())
+
+    @staticmethod
+    def has_minimum_size(boxes, class_id, min_width, min_height):
+        """
+        Check if all boxes of class_id are wider than min_width and higher than min_height,
+        evaluated on the whole boxes.cls and boxes.xywh tensors at once.
+
+        Args:
+            boxes: The boxes of a result (ultralytics Boxes).
+            class_id: The class of the boxes to check.
+            min_width: Minimum width in pixels (exclusive).
+            min_height: Minimum height in pixels (exclusive).
+
+        Returns:
+            bool: True if every box of class_id is large enough, also when there are no such boxes.
+        """
+        sizes = boxes.xywh[boxes.cls == class_id, 2:4]
+        return bool(((sizes[:, 0] > min_width) & (sizes[:, 1] > min_height)).all())
+
     def create_proj_save_dir(self):
         """
         See ibase_project.py
@@ -74,7 +143,11 @@ class BaseProject(IBaseProject):
         model_names = config.get('models')
         allowed_classes = config.get('allowed_classes')
 
+        if config.get('backend', 'pytorch') not in self.BACKENDS:
+            raise TypeError(f'Error while reading configuration file, backend should be one of {self.BACKENDS}')
+
         if model_names and allowed_classes and len(model_names) == len(allowed_classes):
+            self.inference_region = InferenceRegion.from_config(config)
             print('Configuration file valid!')
             return config
 
@@ -92,15 +165,92 @@ class BaseProject(IBaseProject):
         model_dir = pjoin(_cur_dir, f'../models')
         model_dir = pabspath(model_dir)  # normalise the link
 
+        backend = self._config.get('backend', 'pytorch')
         models = []
         for model_name in self._config.get('models'):
-            model = YOLO(pjoin(model_dir, model_name)).to(self.device)
+            if backend == 'pytorch':
+                model = YOLO(pjoin(model_dir, model_name)).to(self.device)
+            else:
+                # The exported model runs through its own runtime, which selects the device when it is loaded.
+                model = YOLO(self.export_model(pjoin(model_dir, model_name), backend), task='detect')
             models.append(model)
 
         return models
 
+    @staticmethod
+    def export_model(weights_path, backend):
+        """
+        Export PyTorch weights to an optimized inference backend, once. The exported model is cached next to the
+        weights (yolov8n.onnx or yolov8n_openvino_model/ for yolov8n.pt), and exported again when the weights change.
+
+        Args:
+            weights_path: Path of the .pt weights.
+            backend: onnx or openvino.
+
+        Returns:
+            str: Path of the exported model.
+        """
+        root, _ = os.path.splitext(weights_path)
+        exported_path = f'{root}.onnx' if backend == 'onnx' else f'{root}_openvino_model'
+        if os.path.exists(exported_path) and os.path.getmtime(exported_path) >= os.path.getmtime(weights_path):
+            return exported_path
+
+        print(f'Exporting {pbasename(weights_path)} to {backend}, cached under {exported_path}')
+        # Dynamic input shapes, so batches (BATCH_SIZE) and tiles of any size can be predicted.
+        return str(YOLO(weights_path).export(format=backend, dynamic=True))
+
     def reset_models(self):
         """
         See ibase_project.py
         """
-        self.models = self.__connect_models__()
+        start_time = time.time()
+
+        # Only the per-video tracking state is cleared, the loaded weights stay in memory.
+        # tracker.reset() is not used, it also resets the track id counter, which is shared by all trackers of the
+        # process. Workers evaluating other videos would hand out the ids of their active tracks a second time.
+        for model in self.models:
+            for tracker in getattr(model.predictor, 'trackers', []):
+                tracker.tracked_stracks = []
+                tracker.lost_stracks = []
+                tracker.removed_stracks = []
+                tracker.frame_id = 0
+                tracker.kalman_filter = tracker.get_kalmanfilter()
+                # BOTSORT also resets its camera motion compensation, which holds the previous frame of the video.
+                if hasattr(tracker, 'gmc'):
+                    tracker.gmc.reset_params()
+
+        self.reset_time = time.time() - start_time
+        if self._var.TIME_VERBOSE:
+            print(f'Reset trackers of {len(self.models)} models in {round(self.reset_time, 4)}s')
+
+    def fork(self, worker_id):
+        """
+        See ibase_project.py
+        """
+        # Set up the predictors of the shared models once, so the weights are fused before workers use them.
+        for model in self.models:
+            if model.predictor is None:
+                model.predict(source=np.zeros((64, 64, 3), dtype=np.uint8), verbose=False, device=self.device)
+
+        root, extension = os.path.splitext(self.temp_path)
+        worker_project = copy.copy(self)
+        worker_project.temp_path = f'{root}-{worker_id}{extension}'
+        worker_project.models = [self.__share_model__(model) for model in self.models]
+        worker_project.stage_rejections = Counter()
+        return worker_project
+
+    @staticmethod
+    def __share_model__(model):
+        """
+        Create a YOLO model that shares the weights of the given model, but has its own predictor and tracker state.
+
+        Args:
+            model: The loaded YOLO model.
+
+        Returns:
+            The YOLO model sharing the weights.
+        """
+        shared_model = copy.copy(model)
+        shared_model.predictor = None
+        shared_model.callbacks = callbacks.get_default_callbacks()
+        return shared_model
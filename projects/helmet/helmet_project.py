@@ -40,20 +40,44 @@ class HelmetProject(BaseProject, IHelmetProject):
         person_model1 = self.mapping[person_model0][1]  # Mapping person from model1 to model0
         helmet_model0 = 1
 
-        has_person_model0 = any(box.cls == person_model0 for box in total_results[0].boxes)
-        has_helmet_model0 = any(box.cls == helmet_model0 for box in total_results[0].boxes)
-        has_person_model1 = any(box.cls == person_model1 for box in total_results[1].boxes)
-        has_minimum_width_height_model0 = all(box.xywh[0, 2] > self.min_width
-                                              and box.xywh[0, 3] > self.min_height for box in total_results[0].boxes
-                                              if box.cls == person_model0)
-        has_minimum_width_height_model1 = all(box.xywh[0, 2] > self.min_width
-                                              and box.xywh[0, 3] > self.min_height for box in total_results[1].boxes
-                                              if box.cls == person_model1)
+        has_person_model0 = self.has_class(total_results[0].boxes, person_model0)
+        has_helmet_model0 = self.has_class(total_results[0].boxes, helmet_model0)
+        has_person_model1 = self.has_class(total_results[1].boxes, person_model1)
+        has_minimum_width_height_model0 = self.has_minimum_size(
+            total_results[0].boxes, person_model0, self.min_width, self.min_height)
+        has_minimum_width_height_model1 = self.has_minimum_size(
+            total_results[1].boxes, person_model1, self.min_width, self.min_height)
         if has_person_model0 and has_helmet_model0 and has_person_model1 and has_minimum_width_height_model0 and has_minimum_width_height_model1:
             return True
         else:
             return False
 
+    def stage_condition(self, stage, partial_results):
+        """
+        Apply the part of condition_func that only depends on the helmet model,
+        so yolov8x is only executed for frames in which the helmet model found:
+        - PERSON detection
+        - HELMET detection
+        - All PERSON bounding boxes with height greater than minimum_height and width greater than minimum_width
+
+        Returns:
+            True if the next models should be executed.
+        """
+        results = partial_results[stage]
+        if len(results) == 0:
+            return False
+        if stage > 0:
+            return True
+
+        person_model0 = 2
+        helmet_model0 = 1
+
+        has_person_model0 = self.has_class(results.boxes, person_model0)
+        has_helmet_model0 = self.has_class(results.boxes, helmet_model0)
+        has_minimum_width_height_model0 = self.has_minimum_size(
+            results.boxes, person_model0, self.min_width, self.min_height)
+        return has_person_model0 and has_helmet_model0 and has_minimum_width_height_model0
+
     def class_mapping(self, models):
         """
         See ihelmet_project.py
@@ -34,6 +34,22 @@ class IBaseProject(ABC):
         """
         pass
 
+    @abstractmethod
+    def stage_condition(self, stage, partial_results):
+        """
+        Defines a cheap gate that is checked after every model (stage) in the cascade of models.
+        When it returns False, the remaining, more expensive models are skipped for the frame.
+        Every stage condition should only reject frames that can never satisfy condition_func.
+
+        Args:
+            stage: Index of the model that was just executed.
+            partial_results: Results of the models executed so far, the last one belongs to stage.
+
+        Returns:
+            True if the next models should be executed.
+        """
+        pass
+
     @abstractmethod
     def create_proj_save_dir(self):
         """
@@ -44,7 +60,7 @@ class IBaseProject(ABC):
     @abstractmethod
     def __read_config__(self, path):
         """
-        Read project's configuration file.
+        Read project's configuration file, including the optional inference region (roi, tiles).
 
         Returns:
             tuple: Configuration file in dictionary format.
@@ -70,7 +86,23 @@ class IBaseProject(ABC):
     @abstractmethod
     def reset_models(self):
         """
-        Reset model after processing video to avoid memory allocation error when the upcoming video comes in with
-        different resolution.
+        Reset the tracker state of the models after processing a video, so the upcoming video starts without the
+        tracks and state of the previous resolution. Track IDs keep counting up, they are unique per process,
+        so workers do not reuse each other's IDs. The loaded weights are kept in memory.
+        """
+        pass
+
+    @abstractmethod
+    def fork(self, worker_id):
+        """
+        Create a copy of the project for a worker processing videos concurrently.
+        The copy shares the loaded model weights, but has its own temp path and tracker state.
+        Should be called from the main thread, before the workers start.
+
+        Args:
+            worker_id: Unique id of the worker, used to derive its temp path.
+
+        Returns:
+            The forked project.
         """
         pass
@@ -1,10 +1,20 @@
 # This script is used to look for objects under a specific condition (at least 5 persons etc)
 # The script reads a video from a message queue, classifies the objects in the video, and does a condition check.
 # If condition is met, the video is being forwarded to a remote vault.
+import asyncio
+import glob
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 from exports.export_factory import ExportFactory
 from integrations.integration_factory import IntegrationFactory
 from projects.project_factory import ProjectFactory
+from services.async_harvest_service import AsyncHarvestService
 from services.harvest_service import HarvestService
+from services.media_prefetcher import MediaPrefetcher
 from utils.VariableClass import VariableClass
 from utils.time_verbose_object import TimeVerbose
 
@@ -16,8 +26,37 @@ def init():
     # Service and Project initializations
     project = ProjectFactory().init()
     integration = IntegrationFactory().init()
-    export = ExportFactory().init()
-    harvest_service = HarvestService()
+
+    if var.NUMBER_OF_WORKERS <= 1:
+        run(project, integration, ExportFactory().init())
+        return
+
+    # Keep NUMBER_OF_WORKERS videos in flight, every worker has its own connections, temp file, export directory
+    # and tracker state, while the loaded model weights are shared between all of them.
+    workers = []
+    for worker_id in range(var.NUMBER_OF_WORKERS):
+        worker = threading.Thread(
+            target=run,
+            args=(project.fork(worker_id), integration, ExportFactory().init(worker_id)),
+            name=f'worker-{worker_id}',
+            daemon=True)
+        worker.start()
+        workers.append(worker)
+
+    for worker in workers:
+        worker.join()
+
+
+def run(project, integration, export):
+    """
+    Receive and process messages from the queue, forever.
+
+    Args:
+        project: The project to evaluate the videos with.
+        integration: The integration to upload the dataset to.
+        export: The export to save the frames with.
+    """
+    harvest_service = AsyncHarvestService() if var.ASYNC_SERVICE else HarvestService()
 
     # register to service
     harvest_service.register('project', project)
@@ -26,6 +65,16 @@ def init():
 
     harvest_service.connect('rabbitmq', 'kerberos_vault')
 
+    if var.DATASET_UPLOAD:
+        upload_staged_datasets(integration, export)
+
+    if var.ASYNC_SERVICE:
+        asyncio.run(run_async(harvest_service, integration))
+        return
+
+    if var.PREFETCH_DEPTH > 0:
+        run_pipelined(harvest_service, integration)
+        return
 
     while True:
         # Receive message from the queue,
@@ -34,38 +83,169 @@ def init():
         if message is None:
             continue  # No message received, continue to the next iteration
 
-        media_key, provider = message['payload']['key'], message['source']
-
-        time_verbose = TimeVerbose()
-        video = harvest_service.open_video(message)
-
-        if var.LOGGING:
-            print(f'5. Classifying frames')
-        if var.TIME_VERBOSE:
-            time_verbose.add_preprocessing_time()
+        process_message(harvest_service, integration, message)
+
+
+def upload_staged_datasets(integration, export):
+    """
+    Upload the datasets that were staged for a background upload, but not uploaded before the last exit.
+
+    Args:
+        integration: The integration to upload the datasets to.
+        export: The export of this worker, the staged datasets are next to its dataset directory.
+    """
+    dataset_dir = os.path.join(export.proj_dir, f'{var.DATASET_FORMAT}-v{var.DATASET_VERSION}')
+    for staged_dir in sorted(glob.glob(f'{glob.escape(dataset_dir)}-{"[0-9a-f]" * 8}')):
+        if not os.path.isdir(staged_dir):
+            continue
+        print(f'Uploading the dataset {staged_dir} that was left from a previous run')
+        integration.upload_dataset(staged_dir)
+        if os.path.isdir(staged_dir) and not any(files for _, _, files in os.walk(staged_dir)):
+            shutil.rmtree(staged_dir)
+
+
+def run_pipelined(harvest_service, integration):
+    """
+    Process messages forever, while the next messages are received and their media is retrieved in the background.
+    The dataset upload and the removal of the recording also happen in the background.
+
+    Args:
+        harvest_service: The connected harvest service.
+        integration: The integration to upload the dataset to.
+    """
+    prefetcher = MediaPrefetcher(harvest_service, var.PREFETCH_DEPTH, var.PREFETCH_MAX_DISK_USAGE * 1024 * 1024)
+    prefetcher.start()
+    finisher = ThreadPoolExecutor(max_workers=1)
+    pending = None
 
-        # Evaluate the video
-        save_dir = harvest_service.evaluate(video)
-
-        # Upload dataset if True
-        if var.DATASET_UPLOAD:
-            integration.upload_dataset(save_dir)
-
-        # We might remove the recording from the vault after analyzing it. (default is False)
-        # This might be the case if we only need to create a dataset from the recording and do not need to store it.
-        # Delete the recording from Kerberos Vault if the REMOVE_AFTER_PROCESSED is set to True.
-        harvest_service.delete_media(media_key, provider)
-
-        if var.TIME_VERBOSE:
-            time_verbose.add_preprocessing_time()
-
-        # Depending on the TIME_VERBOSE parameter, the time it took to classify the objects is printed.
-        if var.TIME_VERBOSE:
-            time_verbose.show_result()
-
-        if var.LOGGING:
-            print('8) Releasing video writer and closing video capture')
-            print("\n\n")
+    while True:
+        message, media_savepath = prefetcher.get()
+        finished = process_message(harvest_service, integration, message, media_savepath, finisher)
+        prefetcher.release(media_savepath)
+
+        # Allow a single video to be finished in the background, errors of the previous one are raised here.
+        if pending:
+            pending.result()
+        pending = finished
+
+
+async def run_async(harvest_service, integration):
+    """
+    Process messages forever with the asyncio service. Messages are pushed by RabbitMQ,
+    the media of the next message is retrieved and the previous dataset is uploaded while a video is evaluated.
+
+    Args:
+        harvest_service: The connected AsyncHarvestService.
+        integration: The integration to upload the dataset to.
+    """
+    # The video being evaluated and the one being retrieved use alternating temp paths.
+    root, extension = os.path.splitext(harvest_service.project.temp_path)
+    slots = [f'{root}-async{index}{extension}' for index in range(2)]
+    slot = 0
+    receiving = asyncio.ensure_future(harvest_service.receive_message_async(slots[slot]))
+    pending = None
+
+    try:
+        while True:
+            message = await receiving
+            media_savepath = slots[slot]
+            if message is None:
+                receiving = asyncio.ensure_future(harvest_service.receive_message_async(media_savepath))
+                continue
+
+            slot = 1 - slot
+            receiving = asyncio.ensure_future(harvest_service.receive_message_async(slots[slot]))
+            finished = await harvest_service.run_inference(
+                process_message, harvest_service, integration, message, media_savepath, harvest_service.io_executor)
+
+            # Allow a single video to be finished in the background, errors of the previous one are raised here.
+            if pending:
+                await asyncio.wrap_future(pending)
+            pending = finished
+    finally:
+        # Stop the consumer, the message that is not handed over yet is redelivered by the broker.
+        receiving.cancel()
+        harvest_service.stop_consuming()
+
+
+def process_message(harvest_service, integration, message, media_savepath=None, finisher=None):
+    """
+    Evaluate the video of a received message, upload the dataset and remove the recording.
+
+    Args:
+        harvest_service: The harvest service that received the message.
+        integration: The integration to upload the dataset to.
+        message: The received message.
+        media_savepath: Path of the retrieved media, defaults to the temp path of the project.
+        finisher: Executor to upload the dataset and remove the recording in, None to do it right away.
+
+    Returns:
+        Future of the upload and removal when a finisher is given, otherwise None.
+    """
+    media_key, provider = message['payload']['key'], message['source']
+
+    time_verbose = TimeVerbose()
+    video = harvest_service.open_video(message, media_savepath)
+
+    if var.LOGGING:
+        print(f'5. Classifying frames')
+    if var.TIME_VERBOSE:
+        time_verbose.add_preprocessing_time()
+
+    # Evaluate the video
+    save_dir = harvest_service.evaluate(video)
+    video.release()
+    time_verbose.total_time_model_reset = harvest_service.project.reset_time
+
+    staged = False
+    if finisher and var.DATASET_UPLOAD and save_dir and os.path.exists(save_dir):
+        # Move the dataset aside, so the next video can be exported while this one is being uploaded.
+        staged_dir = f'{save_dir}-{uuid.uuid4().hex[:8]}'
+        os.rename(save_dir, staged_dir)
+        save_dir, staged = staged_dir, True
+
+    finished = None
+    if finisher:
+        finished = finisher.submit(finish_message, harvest_service, integration, save_dir, media_key, provider, staged)
+    else:
+        finish_message(harvest_service, integration, save_dir, media_key, provider)
+
+    if var.TIME_VERBOSE:
+        time_verbose.add_preprocessing_time()
+
+    # Depending on the TIME_VERBOSE parameter, the time it took to classify the objects is printed.
+    if var.TIME_VERBOSE:
+        time_verbose.show_result()
+
+    if var.LOGGING:
+        print('8) Releasing video writer and closing video capture')
+        print("\n\n")
+
+    return finished
+
+
+def finish_message(harvest_service, integration, save_dir, media_key, provider, staged=False):
+    """
+    Upload the dataset of an evaluated video and remove the recording from the vault.
+
+    Args:
+        harvest_service: The harvest service that received the message.
+        integration: The integration to upload the dataset to.
+        save_dir: Directory of the dataset.
+        media_key: The key of the media in the vault.
+        provider: The provider of the media in the vault.
+        staged: Whether save_dir is a staged copy of the dataset, which is removed once it is uploaded.
+    """
+    # Upload dataset if True
+    if var.DATASET_UPLOAD:
+        integration.upload_dataset(save_dir)
+        if staged and os.path.isdir(save_dir) and not any(files for _, _, files in os.walk(save_dir)):
+            shutil.rmtree(save_dir)
+
+    # We might remove the recording from the vault after analyzing it. (default is False)
+    # This might be the case if we only need to create a dataset from the recording and do not need to store it.
+    # Delete the recording from Kerberos Vault if the REMOVE_AFTER_PROCESSED is set to True.
+    harvest_service.delete_media(media_key, provider)
 
 
 # Run the init function.
@@ -0,0 +1,91 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from services.harvest_service import HarvestService
+from services.message_consumer import MessageConsumer
+
+
+class AsyncHarvestService(HarvestService):
+    """
+    AsyncHarvestService is the asyncio variant of the HarvestService, it still implements IHarvestService.
+    Messages are pushed by RabbitMQ instead of polled, and the blocking calls (media retrieval, inference,
+    uploads and removals) run in executors, so the network I/O of one video overlaps with the inference of another.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        super().__init__()
+        self.consumer = None
+        # The models are evaluated one video at a time, the network I/O has its own threads.
+        self.inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+        self.io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='io')
+
+    async def start_consuming(self):
+        """
+        Start receiving the messages pushed by RabbitMQ, the service has to be connected.
+        """
+        if self.consumer is None:
+            self.consumer = MessageConsumer(self.rabbitmq, asyncio.get_running_loop())
+            self.consumer.start()
+
+    def stop_consuming(self):
+        """
+        Stop receiving messages, a message that is not yet handed over is redelivered by RabbitMQ.
+        """
+        if self.consumer:
+            self.consumer.stop()
+            self.consumer = None
+
+    async def receive_message_async(self, media_savepath=None):
+        """
+        Wait for the next message pushed by RabbitMQ and retrieve its media from Kerberos Vault.
+        The asyncio counterpart of receive_message.
+
+        Args:
+            media_savepath: Path to save the media to. Defaults to the temp path of the project.
+
+        Returns:
+            dict or None: The received message, None if its media could not be retrieved.
+        """
+        await self.start_consuming()
+        if self.consumer.messages.empty():
+            # Send the deletes that are still collected while there is nothing else to do.
+            await self.run_io(self.vault.flush_deletes)
+        if self._var.LOGGING:
+            print('1) Waiting for a message from RabbitMQ')
+        message = await self.consumer.get()
+
+        if self._var.LOGGING:
+            print('2) Retrieving media from Kerberos Vault')
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(self.io_executor, self.__download_video__, message, media_savepath):
+            return None
+        return message
+
+    async def run_inference(self, function, *args):
+        """
+        Run a blocking function that uses the models, e.g. evaluate, in the inference executor.
+
+        Args:
+            function: The blocking function.
+            *args: Arguments of the function.
+
+        Returns:
+            The result of the function.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.inference_executor, function, *args)
+
+    async def run_io(self, function, *args):
+        """
+        Run a blocking network call, e.g. an upload or delete_media, in the I/O executor.
+
+        Args:
+            function: The blocking function.
+            *args: Arguments of the function.
+
+        Returns:
+            The result of the function.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, function, *args)
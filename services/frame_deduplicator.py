@@ -0,0 +1,107 @@
+import os
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class FrameDeduplicator:
+    """
+    In-memory index of the recently saved frames per camera and project, to drop near-duplicate frames before
+    they are encoded, stored and uploaded. A frame is described by a 64-bit difference hash of its pixels
+    and by the layout of its boxes (class and coarse position). Static cameras produce long stretches of
+    almost identical frames, which only differ by a few bits of the hash and have the same layout.
+    """
+
+    def __init__(self, max_distance=4, history_size=32, grid_size=4):
+        """
+        Constructor.
+
+        Args:
+            max_distance: Maximum number of differing hash bits of a near-duplicate frame.
+            history_size: Number of saved frames remembered per camera and project.
+            grid_size: Number of cells per axis, the boxes of near-duplicate frames are in the same cells.
+        """
+        self.max_distance = max_distance
+        self.history_size = max(history_size, 1)
+        self.grid_size = max(grid_size, 1)
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, key, frame, labels_and_boxes):
+        """
+        Check if a frame is a near-duplicate of a recently saved frame, otherwise remember it as saved.
+
+        Args:
+            key: Index key of the frame, e.g. (project, camera), see camera_key.
+            frame: The (cropped) frame that is about to be saved.
+            labels_and_boxes: The labels of the frame, one "class x y w h" line per box.
+
+        Returns:
+            bool: True if the frame should be dropped.
+        """
+        frame_hash = self.__frame_hash__(frame)
+        layout = self.__layout__(labels_and_boxes)
+
+        with self._lock:
+            history = self._index.setdefault(key, deque(maxlen=self.history_size))
+            for saved_hash, saved_layout in history:
+                if saved_layout == layout and bin(frame_hash ^ saved_hash).count('1') <= self.max_distance:
+                    return True
+            history.append((frame_hash, layout))
+        return False
+
+    @staticmethod
+    def camera_key(media_key):
+        """
+        The camera of a recording. Kerberos Agent names recordings {timestamp}_{region}_{camera}_..., other keys
+        are indexed by their directory.
+
+        Args:
+            media_key: The key of the media in the vault.
+
+        Returns:
+            str: The camera of the recording.
+        """
+        directory, file_name = os.path.split(str(media_key))
+        parts = file_name.split('_')
+        if len(parts) >= 3 and parts[0].isdigit():
+            return f'{directory}/{parts[2]}'
+        return directory or file_name
+
+    @staticmethod
+    def __frame_hash__(frame):
+        """
+        Difference hash of a frame: whether every pixel of a 9x8 grayscale thumbnail is brighter than its neighbour.
+
+        Args:
+            frame: The BGR or grayscale frame.
+
+        Returns:
+            int: The 64-bit hash.
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        thumbnail = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = np.packbits(thumbnail[:, 1:] > thumbnail[:, :-1])
+        return int.from_bytes(bits.tobytes(), 'big')
+
+    def __layout__(self, labels_and_boxes):
+        """
+        Layout of the boxes: the sorted classes and grid cells of their centres.
+
+        Args:
+            labels_and_boxes: The labels of the frame, one "class x y w h" line per box.
+
+        Returns:
+            tuple: The layout.
+        """
+        layout = []
+        for line in labels_and_boxes.splitlines():
+            values = line.split()
+            if len(values) < 3:
+                continue
+            cell_x = min(int(float(values[1]) * self.grid_size), self.grid_size - 1)
+            cell_y = min(int(float(values[2]) * self.grid_size), self.grid_size - 1)
+            layout.append((values[0], cell_x, cell_y))
+        return tuple(sorted(layout))
@@ -0,0 +1,251 @@
+import math
+import queue
+import threading
+
+import cv2
+
+
+def next_sampled_frame_number(frame_number, frame_skip_factor, skip_until=0):
+    """
+    Calculate the number of the next frame that has to be evaluated.
+
+    Args:
+        frame_number: Number of the last frame that was read (frames are numbered from 1).
+        frame_skip_factor: Only every frame_skip_factor-th frame is evaluated.
+        skip_until: Frames up to and including this number are skipped after a detection.
+
+    Returns:
+        int: The number of the next sampled frame, or None if no frame is sampled at all.
+    """
+    if frame_skip_factor <= 0:
+        return None
+    first_candidate = max(frame_number, skip_until) + 1
+    return -(-first_candidate // frame_skip_factor) * frame_skip_factor
+
+
+class FrameSampler:
+    """
+    FrameSampler decides which frames of a video are evaluated. By default every frame_skip_factor-th frame is
+    sampled, see next_sampled_frame_number. The adaptive sampler backs off through empty stretches, doubling the
+    stride after every uninteresting frame up to max_stride * frame_skip_factor, and falls back to
+    frame_skip_factor / densify as soon as a detection or scene change is observed. The number of sampled frames
+    can be limited by a budget per video, the stride is then at least the remaining frames / the remaining budget.
+    A frame only counts towards the budget once it is evaluated (observed), frames that are scheduled but dropped
+    before, e.g. decoded ahead and skipped after a detection, give their share of the budget back (discarded).
+    """
+
+    def __init__(self, frame_skip_factor, max_frame_number, budget=0, max_stride=1, densify=1):
+        """
+        Constructor.
+
+        Args:
+            frame_skip_factor: Stride of the uniform sampling.
+            max_frame_number: Total number of frames in the video.
+            budget: Maximum number of sampled frames of the video (0 = unlimited).
+            max_stride: Maximum stride in empty stretches, as a multiple of frame_skip_factor.
+            densify: Divides frame_skip_factor to get the stride around interesting frames.
+        """
+        self.frame_skip_factor = frame_skip_factor
+        self.max_frame_number = max_frame_number
+        self.budget = budget
+        self.adaptive = budget > 0 or max_stride > 1 or densify > 1
+        self.min_stride = max(frame_skip_factor // max(densify, 1), 1)
+        self.max_stride = max(frame_skip_factor * max(max_stride, 1), self.min_stride)
+        self.sampled_frames = 0
+        self._scheduled_frames = 0
+        self._stride = self.min_stride
+        self._last_sampled = 0
+        self._condition = threading.Condition()
+
+    def next_frame_number(self, frame_number, skip_until=0):
+        """
+        Calculate the number of the next frame that has to be evaluated, and schedule it.
+
+        Args:
+            frame_number: Number of the last frame that was read (frames are numbered from 1).
+            skip_until: Frames up to and including this number are skipped after a detection.
+
+        Returns:
+            int: The number of the next sampled frame, or None if no frame is sampled anymore,
+                 see wait_for_scheduled_frames when the budget is held by scheduled frames.
+        """
+        if not self.adaptive:
+            return next_sampled_frame_number(frame_number, self.frame_skip_factor, skip_until)
+        if self.frame_skip_factor <= 0:
+            return None
+
+        with self._condition:
+            stride = self._stride
+            if self.budget > 0:
+                remaining_budget = self.budget - self.sampled_frames - self._scheduled_frames
+                if remaining_budget <= 0:
+                    return None
+                stride = max(stride, math.ceil((self.max_frame_number - self._last_sampled) / remaining_budget))
+
+            target = max(self._last_sampled + stride, max(frame_number, skip_until) + 1)
+            self._last_sampled = target
+            self._scheduled_frames += 1
+        return target
+
+    def wait_for_scheduled_frames(self, timeout):
+        """
+        Wait until a scheduled frame is evaluated or discarded, so its share of the budget is known.
+
+        Args:
+            timeout: Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if frames were still scheduled, the next frame number should be asked again.
+        """
+        with self._condition:
+            if self._scheduled_frames <= 0:
+                return False
+            self._condition.wait(timeout)
+            return True
+
+    def discard(self):
+        """
+        Give the budget of a scheduled frame back, the frame is dropped without being evaluated.
+        """
+        with self._condition:
+            self._scheduled_frames = max(self._scheduled_frames - 1, 0)
+            self._condition.notify_all()
+
+    def observe(self, interesting):
+        """
+        Adapt the stride to the outcome of an evaluated frame.
+
+        Args:
+            interesting: Whether the frame contained a detection or a scene change.
+        """
+        with self._condition:
+            self._stride = self.min_stride if interesting else min(self._stride * 2, self.max_stride)
+            self.sampled_frames += 1
+            self._scheduled_frames = max(self._scheduled_frames - 1, 0)
+            self._condition.notify_all()
+
+
+class FrameProducer(threading.Thread):
+    """
+    FrameProducer decodes the frames that will be evaluated in a background thread and pushes them into a bounded
+    queue. Frames in between are grabbed without decoding, or skipped by seeking when the gap is large enough.
+    """
+
+    def __init__(self, cap, frame_skip_factor, max_frame_number, queue_size=8, seek_threshold=0, sampler=None):
+        """
+        Constructor.
+
+        Args:
+            cap: The opened cv2.VideoCapture, it should not be used by anyone else while the producer runs.
+            frame_skip_factor: Only every frame_skip_factor-th frame is decoded.
+            max_frame_number: Total number of frames in the video.
+            queue_size: Maximum number of decoded frames waiting to be evaluated.
+            seek_threshold: Seek instead of grabbing when at least this many frames are skipped (0 = never seek).
+            sampler: FrameSampler deciding which frames are decoded, defaults to every frame_skip_factor-th frame.
+        """
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.frame_skip_factor = frame_skip_factor
+        self.max_frame_number = max_frame_number
+        self.seek_threshold = seek_threshold
+        self.sampler = sampler or FrameSampler(frame_skip_factor, max_frame_number)
+        self.error = None
+        self._queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._skip_until = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def skip_until(self, frame_number):
+        """
+        Skip all frames up to and including frame_number, e.g. after a detection.
+        Frames that were already decoded ahead are dropped when they are consumed.
+
+        Args:
+            frame_number: Number of the last frame to skip.
+        """
+        with self._lock:
+            self._skip_until = max(self._skip_until, frame_number)
+
+    def run(self):
+        """
+        Decode the sampled frames until the end of the video or until the producer is stopped.
+        """
+        position = 0
+        try:
+            while not self._stop_event.is_set():
+                with self._lock:
+                    skip_until = self._skip_until
+                target = self.sampler.next_frame_number(position, skip_until)
+                if target is None and self.sampler.wait_for_scheduled_frames(timeout=0.1):
+                    # The budget is held by frames that are not evaluated yet, dropped frames give it back.
+                    continue
+                if target is None or target > self.max_frame_number:
+                    break
+
+                gap = target - position - 1
+                if 0 < self.seek_threshold <= gap:
+                    # CAP_PROP_POS_FRAMES is the 0-based index of the next frame to decode.
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, target - 1)
+                else:
+                    if not all(self.cap.grab() for _ in range(gap)):
+                        break
+
+                success, frame = self.cap.read()
+                position = target
+                if not success:
+                    break
+                self.__put__((target, frame))
+        except Exception as e:
+            self.error = e
+        finally:
+            # End of stream marker
+            self.__put__(None)
+
+    def stop(self):
+        """
+        Stop decoding, release the frames that are still queued and wait for the thread to finish.
+        """
+        self._stop_event.set()
+        while self.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.join()
+
+    def __iter__(self):
+        """
+        Iterate over the decoded frames in order.
+
+        Yields:
+            tuple: The frame number and the decoded frame.
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            frame_number, frame = item
+            with self._lock:
+                skipped = frame_number <= self._skip_until
+            if skipped:
+                self.sampler.discard()
+            else:
+                yield frame_number, frame
+
+        if self.error is not None:
+            raise self.error
+
+    def __put__(self, item):
+        """
+        Put an item in the queue, blocking while the queue is full unless the producer is stopped.
+
+        Args:
+            item: The item to put in the queue.
+        """
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
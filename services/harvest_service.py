@@ -1,11 +1,16 @@
 from uugai_python_dynamic_queue.MessageBrokers import RabbitMQ
-from uugai_python_kerberos_vault.KerberosVault import KerberosVault
 from services.iharvest_service import IHarvestService
 from utils.VariableClass import VariableClass
 from condition import process_frame as con_process_frame
+from condition import process_frames as con_process_frames
+from services.frame_deduplicator import FrameDeduplicator
+from services.frame_producer import FrameProducer, FrameSampler
+from services.media_cache import MediaCache
+from services.motion_filter import MotionFilter
+from services.stream_uploader import StreamUploader
+from services.vault_client import VaultClient
 
 import time
-import requests
 import os
 import cv2
 
@@ -27,8 +32,25 @@ class HarvestService(IHarvestService):
         self.predicted_frames = 0
         self.max_frame_number = None
         self.frame_skip_factor = 0
+        self.sampler = None
+        self.skip_until = 0
+        self.media_key = None
+        self.duplicate_frames = 0
         # Initialize the VariableClass object, which contains all the necessary environment variables.
         self._var = VariableClass()
+        # Keeps track of which media is stored under which path, so a message is never fetched twice.
+        self.retrieved_media = {}
+        self.media_cache = None
+        if self._var.MEDIA_CACHE_DIR:
+            self.media_cache = MediaCache(self._var.MEDIA_CACHE_DIR, self._var.MEDIA_CACHE_SIZE * 1024 * 1024)
+        self.deduplicator = None
+        if self._var.DEDUP_MAX_DISTANCE >= 0:
+            self.deduplicator = FrameDeduplicator(
+                self._var.DEDUP_MAX_DISTANCE, self._var.DEDUP_HISTORY, self._var.DEDUP_GRID)
+        self.motion_filter = None
+        if self._var.MOTION_THRESHOLD > 0:
+            self.motion_filter = MotionFilter(
+                self._var.MOTION_THRESHOLD, self._var.MOTION_PIXEL_THRESHOLD, self._var.MOTION_MAX_SKIPPED)
         self.project = None
         self.integration = None
         self.export = None
@@ -55,10 +77,14 @@ class HarvestService(IHarvestService):
         if self._var.LOGGING:
             print('b) Initializing Kerberos Vault')
 
-        self.vault = KerberosVault(
+        self.vault = VaultClient(
             storage_uri=self._var.STORAGE_URI,
             storage_access_key=self._var.STORAGE_ACCESS_KEY,
-            storage_secret_key=self._var.STORAGE_SECRET_KEY)
+            storage_secret_key=self._var.STORAGE_SECRET_KEY,
+            timeout=self._var.VAULT_TIMEOUT,
+            max_retries=self._var.VAULT_MAX_RETRIES,
+            delete_batch_size=self._var.VAULT_DELETE_BATCH_SIZE,
+            delete_flush_interval=self._var.VAULT_DELETE_FLUSH_INTERVAL)
 
     def register(self, name, value_obj):
         """
@@ -81,7 +107,7 @@ class HarvestService(IHarvestService):
         else:
             raise ModuleNotFoundError('Module not found! Make sure name is filled correctly')
 
-    def receive_message(self):
+    def receive_message(self, media_savepath=None):
         """
         See iharvest_service.py
 
@@ -94,6 +120,8 @@ class HarvestService(IHarvestService):
             print('1) Receiving message from RabbitMQ')
         message = self.rabbitmq.receive_message()
         if not message:
+            # Send the deletes that are still collected while there is nothing else to do.
+            self.vault.flush_deletes()
             if self._var.LOGGING:
                 print('No message received, waiting for 3 seconds')
             time.sleep(3)
@@ -101,10 +129,8 @@ class HarvestService(IHarvestService):
         if self._var.LOGGING:
             print('2) Retrieving media from Kerberos Vault')
 
-        self.vault.retrieve_media(
-            message=message,
-            media_type='video',
-            media_savepath=self.project.temp_path)
+        if not self.__download_video__(message, media_savepath):
+            return None
         return message
 
     def delete_media(self, media_key, provider):
@@ -112,49 +138,49 @@ class HarvestService(IHarvestService):
         See iharvest_service.py
         """
         if self._var.REMOVE_AFTER_PROCESSED:
-            # Delete the recording from Kerberos Vault
-            response = requests.delete(
-                self._var.STORAGE_URI + '/storage',
-                headers={
-                    'X-Kerberos-Storage-FileName': media_key,
-                    'X-Kerberos-Storage-Provider': provider,
-                    'X-Kerberos-Storage-AccessKey': self._var.STORAGE_ACCESS_KEY,
-                    'X-Kerberos-Storage-SecretAccessKey': self._var.STORAGE_SECRET_KEY,
-                }
-            )
-            if response.status_code != 200:
-                print(
-                    "Something went wrong while delete media: " + response.content)
-            else:
-                print("Delete media from " + self._var.STORAGE_URI)
+            # Delete the recording from Kerberos Vault, deletes might be collected and sent in groups.
+            self.vault.delete_media(media_key, provider)
 
-    def open_video(self, message=''):
+    def open_video(self, message='', media_savepath=None):
         """
         See iharvest_service.py
 
         Returns:
             cv2.VideoCapture: The video capture object for the opened video.
         """
+        media_savepath = media_savepath or self.project.temp_path
         if message:
-            # Download video from vault if there is a message
-            self.__download_video__(message)
+            # Download video from vault if there is a message, unless receive_message already retrieved it.
+            self.__download_video__(message, media_savepath)
 
         # Open video-capture/recording using the video-path. Throw FileNotFoundError if cap is unable to open.
         if self._var.LOGGING:
-            print(f'4. Opening video file: {self.project.temp_path}')
-        if not os.path.exists(self.project.temp_path):
-            raise FileNotFoundError(f'Cannot find {self.project.temp_path}')
-        if not self.project.temp_path.lower().endswith(('.mp4', '.avi', '.mov')):
+            print(f'4. Opening video file: {media_savepath}')
+        if not os.path.exists(media_savepath):
+            raise FileNotFoundError(f'Cannot find {media_savepath}')
+        if not media_savepath.lower().endswith(('.mp4', '.avi', '.mov')):
             raise TypeError('Unsupported file format! Only support videos with .mp4, .avi, .mov extensions')
-        cap = cv2.VideoCapture(self.project.temp_path)
+        cap = cv2.VideoCapture(media_savepath)
         if not cap.isOpened():
             raise FileNotFoundError('Unable to open video file')
 
         self.frame_number = 0
         self.predicted_frames = 0
+        self.skip_until = 0
+        self.duplicate_frames = 0
+        self.project.stage_rejections.clear()
+        if self.motion_filter:
+            self.motion_filter.reset()
+        self.media_key = message['payload']['key'] if message else os.path.basename(media_savepath)
         self.max_frame_number = cap.get(cv2.CAP_PROP_FRAME_COUNT)
         self.frame_skip_factor = int(
             cap.get(cv2.CAP_PROP_FPS) / self._var.CLASSIFICATION_FPS)
+        self.sampler = FrameSampler(
+            self.frame_skip_factor,
+            self.max_frame_number,
+            budget=self._var.SAMPLING_BUDGET * self._var.MAX_NUMBER_OF_PREDICTIONS if self._var.SAMPLING_BUDGET > 0 else 0,
+            max_stride=self._var.SAMPLING_MAX_STRIDE,
+            densify=self._var.SAMPLING_DENSIFY)
         return cap
 
     def evaluate(self, video):
@@ -165,36 +191,118 @@ class HarvestService(IHarvestService):
             Saved result directory path.
         """
         if self.max_frame_number > 0:
-            skip_frames_counter = 0
-
             # Create save dir and yaml file
             success = self.export.initialize_save_dir()
-            if success and (self._var.DATASET_FORMAT == 'yolov8'):
+            if success and (self._var.DATASET_FORMAT in ('yolov8', 'shard')):
                 self.export.create_yaml(self.project)
 
-            while (self.predicted_frames < self._var.MAX_NUMBER_OF_PREDICTIONS) and (
-                    self.frame_number < self.max_frame_number):
-                # Read the frame from the video-capture.
-                success, frame, skip_frames_counter = self.__get_frame__(video, skip_frames_counter)
-                # Increment frame number after processing
-                self.frame_number += 1
-
-                if not success:
+            # Upload every saved file right away, instead of the whole dataset after the video.
+            uploader = None
+            if self._var.DATASET_UPLOAD and self._var.STREAM_UPLOAD:
+                if StreamUploader.supports(self.integration):
+                    uploader = StreamUploader(self.integration)
+                else:
+                    print(f'Integration {self.integration.name} cannot stream uploads, uploading after the video')
+            self.export.saved_callback = uploader.submit if uploader else None
+
+            # Either decode the sampled frames ahead in a background thread, or read them in this loop.
+            producer = None
+            if self._var.DECODE_AHEAD:
+                producer = FrameProducer(
+                    video,
+                    self.frame_skip_factor,
+                    self.max_frame_number,
+                    queue_size=self._var.FRAME_QUEUE_SIZE,
+                    seek_threshold=self._var.SEEK_THRESHOLD,
+                    sampler=self.sampler)
+                producer.start()
+            frames = producer if producer else self.__read_frames__(video)
+
+            # Sampled frames waiting to be predicted together, as (frame_number, frame) tuples.
+            batch = []
+
+            for frame_number, frame in frames:
+                self.frame_number = frame_number
+
+                if self._var.BATCH_SIZE > 1:
+                    # Collect the sampled frames and predict them at once when the batch is full.
+                    batch.append((frame_number, frame))
+                    if len(batch) < self._var.BATCH_SIZE:
+                        continue
+                    skip_frames_counter = self.__predict_batch__(batch, 0)
+                    batch = []
+                else:
+                    # Predict frame
+                    skip_frames_counter = self.__predict_frame__(frame, 0)
+
+                self.skip_until = max(self.skip_until, self.frame_number + skip_frames_counter)
+                if producer:
+                    producer.skip_until(self.skip_until)
+
+                if self.predicted_frames >= self._var.MAX_NUMBER_OF_PREDICTIONS:
                     break
 
-                if frame is None:
-                    continue
+            # Predict the remaining frames of an incomplete batch.
+            if batch and self.predicted_frames < self._var.MAX_NUMBER_OF_PREDICTIONS:
+                self.__predict_batch__(batch, 0)
+
+            if producer:
+                producer.stop()
+
+            # Wait for the frames that are still being written (and streamed), the dataset is uploaded after evaluate.
+            self.export.flush()
+            if uploader:
+                uploader.wait()
+                self.export.saved_callback = None
+
+            if self._var.LOGGING and self.sampler.adaptive:
+                print(f'Frames sampled by the adaptive sampler: {self.sampler.sampled_frames}')
+            if self._var.LOGGING and self.motion_filter:
+                print(f'Frames without motion skipped: {self.motion_filter.skipped_frames} '
+                      f'({self.motion_filter.skip_rate:.0%} of the sampled frames)')
+            if self._var.LOGGING and self.duplicate_frames:
+                print(f'Near-duplicate frames dropped: {self.duplicate_frames}')
+            if self._var.LOGGING and self.project.stage_rejections:
+                print(f'Frames rejected per model stage: {dict(sorted(self.project.stage_rejections.items()))}')
 
-                # Predict frame
-                skip_frames_counter = self.__predict_frame__(
-                    frame,
-                    skip_frames_counter)
             # Free all resources
             self.project.reset_models()
             cv2.destroyAllWindows()
 
         return self.export.result_dir_path
 
+    def __read_frames__(self, video):
+        """
+        Read the video synchronously and yield the frames that have to be evaluated.
+        Frames in between are grabbed by __get_frame__ without decoding them.
+
+        Args:
+            video: The video capture object.
+
+        Yields:
+            tuple: The frame number and the decoded frame.
+        """
+        # The sampler is asked once per sampled frame, the frames in between are grabbed one by one until it is reached.
+        # skip_until only changes while a yielded frame is evaluated, so the target stays valid until then.
+        next_frame_number = None
+        while self.frame_number < self.max_frame_number:
+            if next_frame_number is None:
+                next_frame_number = self.sampler.next_frame_number(self.frame_number, self.skip_until)
+                if next_frame_number is None:
+                    break
+
+            # Read the frame from the video-capture.
+            success, frame, _ = self.__get_frame__(video, next_frame_number - self.frame_number - 1)
+            # Increment frame number after reading, so it always matches the position in the video.
+            self.frame_number += 1
+
+            if not success:
+                break
+
+            if frame is not None:
+                next_frame_number = None
+                yield self.frame_number, frame
+
     def __get_frame__(self, cap: cv2.VideoCapture, skip_frames_counter):
         """
         See iharvest_service.py
@@ -204,7 +312,10 @@ class HarvestService(IHarvestService):
                    and the updated skip frames counter.
         """
         # Check if we need to skip the current frame due to the skip_frames_counter.
+        # The frame is grabbed without decoding, so the video position stays in sync with the frame number.
         if skip_frames_counter > 0:
+            if not cap.grab():
+                return False, None, skip_frames_counter
             return True, None, skip_frames_counter - 1
 
         success, frame = cap.read()
@@ -220,26 +331,146 @@ class HarvestService(IHarvestService):
         Returns:
             int: The updated skip frames counter.
         """
-        if self.frame_number > 0 and self.frame_skip_factor > 0 and self.frame_number % self.frame_skip_factor == 0:
+        if self.__is_sampled_frame__():
+            motion = self.__check_motion__(frame)
+            if motion == MotionFilter.UNCHANGED:
+                return skip_frames_counter
+
             frame, labels_and_boxes, labeled_frame, total_time_class_prediction, condition_met = con_process_frame(frame, self.project, cv2)
+            # Let the adaptive sampler densify around detections and scene changes.
+            self.sampler.observe(condition_met or motion == MotionFilter.CHANGED)
 
-            if condition_met:
-                self.predicted_frames = self.export.save_frame(frame, self.predicted_frames, cv2, labels_and_boxes, labeled_frame)
+            if condition_met and not self.__is_duplicate__(frame, labels_and_boxes):
+                self.predicted_frames = self.export.save_frame(frame, self.predicted_frames, cv2, labels_and_boxes, labeled_frame,
+                                                              self.media_key, self.frame_number)
                 skip_frames_counter = self._var.FRAMES_SKIP_AFTER_DETECT
                 print(f'5.3. Done, skipping the next {self._var.FRAMES_SKIP_AFTER_DETECT} frames')
             print(f'Currently in frame: {self.frame_number}')
-        self.frame_number += 1
         return skip_frames_counter
 
-    def __download_video__(self, message):
+    def __predict_batch__(self, batch, skip_frames_counter):
+        """
+        Predict a batch of sampled frames at once, the batched counterpart of __predict_frame__.
+
+        Args:
+            batch: List of (frame_number, frame) tuples in reading order.
+            skip_frames_counter: Skipped frame counter (used when condition in 1 frame is met, skip x next frames).
+
+        Returns:
+            int: The updated skip frames counter.
+        """
+        batch = [(frame_number, frame, self.__check_motion__(frame)) for frame_number, frame in batch]
+        batch = [(frame_number, frame, motion) for frame_number, frame, motion in batch if motion != MotionFilter.UNCHANGED]
+        if not batch:
+            return skip_frames_counter
+        results = con_process_frames([frame for _, frame, _ in batch], self.project, cv2)
+
+        skip_until = 0
+        for (frame_number, _, motion), (frame, labels_and_boxes, labeled_frame, _, condition_met) in zip(batch, results):
+            # Let the adaptive sampler densify around detections and scene changes.
+            self.sampler.observe(condition_met or motion == MotionFilter.CHANGED)
+            # Frames that would have been skipped after a detection in the frame by frame path are dropped.
+            if frame_number <= skip_until or self.predicted_frames >= self._var.MAX_NUMBER_OF_PREDICTIONS:
+                continue
+
+            if condition_met and not self.__is_duplicate__(frame, labels_and_boxes):
+                self.predicted_frames = self.export.save_frame(frame, self.predicted_frames, cv2, labels_and_boxes, labeled_frame,
+                                                              self.media_key, frame_number)
+                skip_until = frame_number + self._var.FRAMES_SKIP_AFTER_DETECT
+                print(f'5.3. Done, skipping the next {self._var.FRAMES_SKIP_AFTER_DETECT} frames')
+            print(f'Currently in frame: {frame_number}')
+
+        # Continue skipping in the upcoming frames if the skip window reaches past this batch.
+        return max(skip_frames_counter, skip_until - self.frame_number)
+
+    def __check_motion__(self, frame):
+        """
+        Check if the scene changed enough since the last evaluated frame to run the models on a frame.
+
+        Args:
+            frame: The sampled frame.
+
+        Returns:
+            str: MotionFilter.CHANGED if the scene changed, MotionFilter.UNCHANGED if the frame is skipped,
+                 MotionFilter.REFRESH if it is evaluated without a change (always when there is no motion filter).
+        """
+        if not self.motion_filter:
+            return MotionFilter.REFRESH
+
+        motion = self.motion_filter.check(frame)
+        if motion == MotionFilter.UNCHANGED:
+            # Frames without motion let the adaptive sampler back off.
+            self.sampler.observe(False)
+            print(f'Currently in frame: {self.frame_number}, no motion since the last evaluated frame')
+        return motion
+
+    def __is_duplicate__(self, frame, labels_and_boxes):
+        """
+        Check if a frame that met the condition is a near-duplicate of a frame saved before for the same camera.
+
+        Args:
+            frame: The (cropped) frame that is about to be saved.
+            labels_and_boxes: The labels of the frame.
+
+        Returns:
+            bool: True if the frame should not be saved.
+        """
+        if not self.deduplicator:
+            return False
+
+        key = (self.project.name, FrameDeduplicator.camera_key(self.media_key))
+        if not self.deduplicator.is_duplicate(key, frame, labels_and_boxes):
+            return False
+        self.duplicate_frames += 1
+        print('5.3. Near-duplicate of a saved frame, not saving it')
+        return True
+
+    def __is_sampled_frame__(self):
+        """
+        Check if the current frame has to be predicted according to the frame_skip_factor.
+        The adaptive sampler only yields the frames that have to be predicted.
+
+        Returns:
+            bool: True if the current frame should be predicted.
+        """
+        if self.sampler and self.sampler.adaptive:
+            return self.frame_number > 0
+        return self.frame_number > 0 and self.frame_skip_factor > 0 and self.frame_number % self.frame_skip_factor == 0
+
+    def __download_video__(self, message, media_savepath=None):
         """
         Downloads the video from Kerberos Vault using the provided message details.
+        Every message is fetched only once: a video that is already under media_savepath is kept,
+        and a video found in the local media cache is not downloaded again.
 
         Args:
             message: The message containing details required to retrieve the video.
+            media_savepath: Path to save the video to, defaults to the temp path of the project.
+
+        Returns:
+            bool: True if the video is available under media_savepath.
         """
-        self.vault.retrieve_media(
-            message=message,
-            media_type='video',
-            media_savepath=self.project.temp_path)
-        print(f'Video downloaded under {self.project.temp_path}')
+        media_savepath = media_savepath or self.project.temp_path
+        media_key, provider = message['payload']['key'], message['source']
+
+        if self.retrieved_media.get(media_savepath) == (media_key, provider) and os.path.exists(media_savepath):
+            return True
+        self.retrieved_media.pop(media_savepath, None)
+
+        if self.media_cache and self.media_cache.get(media_key, provider, media_savepath):
+            print(f'Video found in media cache, available under {media_savepath}')
+        else:
+            # Never overwrite the file in place, it might be hard linked to an entry of the media cache.
+            if os.path.exists(media_savepath):
+                os.remove(media_savepath)
+
+            if not self.vault.retrieve_media(message, media_savepath):
+                print(f'Something went wrong while retrieving {media_key} from Kerberos Vault')
+                return False
+
+            if self.media_cache:
+                self.media_cache.put(media_key, provider, media_savepath)
+            print(f'Video downloaded under {media_savepath}')
+
+        self.retrieved_media[media_savepath] = (media_key, provider)
+        return True
@@ -35,10 +35,13 @@ class IHarvestService(ABC):
         pass
 
     @abstractmethod
-    def receive_message(self):
+    def receive_message(self, media_savepath=None):
         """
         Receives a message from RabbitMQ and retrieves the corresponding media
         from Kerberos Vault.
+
+        Args:
+            media_savepath: Path to save the media to. Defaults to the temp path of the project.
         """
         pass
 
@@ -55,12 +58,13 @@ class IHarvestService(ABC):
         pass
 
     @abstractmethod
-    def open_video(self, message=''):
+    def open_video(self, message='', media_savepath=None):
         """
         Opens a video file from the specified path, downloading it from the vault if necessary.
 
         Args:
             message: The message to use for downloading the video. Defaults to ''.
+            media_savepath: Path of the video. Defaults to the temp path of the project.
 
         Raises:
             FileNotFoundError: If the video file cannot be found or opened.
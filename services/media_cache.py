@@ -0,0 +1,107 @@
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+
+
+class MediaCache:
+    """
+    Local content-addressed cache for recordings retrieved from Kerberos Vault.
+    Recordings are keyed by media key and provider, the least recently used ones are evicted
+    when the total size of the cache exceeds max_size bytes.
+    """
+
+    def __init__(self, cache_dir, max_size):
+        """
+        Constructor.
+
+        Args:
+            cache_dir: Directory where the recordings are stored.
+            max_size: Maximum total size of the cache in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get(self, media_key, provider, media_savepath):
+        """
+        Place a cached recording under media_savepath.
+
+        Args:
+            media_key: The key of the media in the vault.
+            provider: The provider of the media in the vault.
+            media_savepath: Path where the recording should be available.
+
+        Returns:
+            bool: True if the recording was cached, False otherwise.
+        """
+        cache_path = self.__cache_path__(media_key, provider)
+        with self._lock:
+            if not os.path.exists(cache_path):
+                return False
+            # Mark the recording as recently used.
+            os.utime(cache_path)
+            self.__link__(cache_path, media_savepath)
+        return True
+
+    def put(self, media_key, provider, media_path):
+        """
+        Add a downloaded recording to the cache, then evict the least recently used recordings if needed.
+
+        Args:
+            media_key: The key of the media in the vault.
+            provider: The provider of the media in the vault.
+            media_path: Path of the downloaded recording.
+        """
+        cache_path = self.__cache_path__(media_key, provider)
+        with self._lock:
+            self.__link__(media_path, cache_path)
+            self.__evict__(keep=cache_path)
+
+    def __cache_path__(self, media_key, provider):
+        """
+        Build the cache path of a recording.
+
+        Returns:
+            str: Path in the cache directory, named after the hash of provider and media key.
+        """
+        digest = hashlib.sha256(f'{provider}/{media_key}'.encode('utf-8')).hexdigest()
+        _, extension = os.path.splitext(media_key)
+        return os.path.join(self.cache_dir, f'{digest}{extension.lower()}')
+
+    def __link__(self, source_path, target_path):
+        """
+        Hard link source_path to target_path, or copy it when both are on different file systems.
+        The target is replaced atomically, and never written in place, so a linked file is not modified.
+        """
+        temp_path = f'{target_path}.{uuid.uuid4().hex}.tmp'
+        try:
+            os.link(source_path, temp_path)
+        except OSError:
+            shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, target_path)
+
+    def __evict__(self, keep):
+        """
+        Remove the least recently used recordings until the cache fits in max_size.
+
+        Args:
+            keep: Path of a recording that should not be evicted.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total_size -= size
+            print(f'Evicted {path} from media cache')
@@ -0,0 +1,104 @@
+import os
+import queue
+import threading
+import time
+
+
+class MediaPrefetcher(threading.Thread):
+    """
+    MediaPrefetcher receives the next messages and retrieves their media into separate temp slots
+    in a background thread, while the current video is being evaluated.
+    """
+
+    def __init__(self, harvest_service, depth=1, max_disk_usage=0):
+        """
+        Constructor.
+
+        Args:
+            harvest_service: Connected harvest service, its message broker should only be used by the prefetcher.
+            depth: Number of messages that are prefetched ahead of the one being evaluated.
+            max_disk_usage: Maximum number of bytes used by the prefetched media (0 = unlimited).
+        """
+        super().__init__(daemon=True)
+        self.harvest_service = harvest_service
+        self.max_disk_usage = max_disk_usage
+        self.error = None
+        self._ready = queue.Queue()
+        self._free_slots = queue.Queue()
+        self._used_slots = set()
+        self._condition = threading.Condition()
+
+        # One slot for the video being evaluated, and one for every prefetched video.
+        root, extension = os.path.splitext(harvest_service.project.temp_path)
+        for index in range(depth + 1):
+            self._free_slots.put(f'{root}-slot{index}{extension}')
+
+    def run(self):
+        """
+        Fill the free slots with the media of the next messages, forever.
+        """
+        try:
+            while True:
+                media_savepath = self._free_slots.get()
+                self.__wait_for_disk_space__()
+
+                message = None
+                while message is None:
+                    message = self.harvest_service.receive_message(media_savepath=media_savepath)
+
+                with self._condition:
+                    self._used_slots.add(media_savepath)
+                self._ready.put((message, media_savepath))
+        except Exception as e:
+            self.error = e
+            self._ready.put(None)
+
+    def get(self):
+        """
+        Wait for the next message of which the media is retrieved.
+
+        Returns:
+            tuple: The message and the path of its media.
+
+        Raises:
+            Exception: The error that stopped the prefetcher.
+        """
+        item = self._ready.get()
+        if item is None:
+            raise self.error
+        return item
+
+    def release(self, media_savepath):
+        """
+        Remove the media of a processed message and make its slot available again.
+
+        Args:
+            media_savepath: Path of the media returned by get().
+        """
+        if os.path.exists(media_savepath):
+            os.remove(media_savepath)
+        with self._condition:
+            self._used_slots.discard(media_savepath)
+            self._condition.notify_all()
+        self._free_slots.put(media_savepath)
+
+    def __wait_for_disk_space__(self):
+        """
+        Wait until the media on disk uses less than max_disk_usage bytes.
+        A download is always allowed when no other media is on disk, so a single large video cannot block forever.
+        """
+        if self.max_disk_usage <= 0:
+            return
+
+        with self._condition:
+            while self._used_slots and self.__disk_usage__() >= self.max_disk_usage:
+                start_time = time.time()
+                self._condition.wait()
+                print(f'Waited {round(time.time() - start_time, 2)}s for disk space to prefetch media')
+
+    def __disk_usage__(self):
+        """
+        Returns:
+            int: Total size in bytes of the media in the used slots.
+        """
+        return sum(os.path.getsize(path) for path in self._used_slots if os.path.exists(path))
@@ -0,0 +1,89 @@
+import asyncio
+import concurrent.futures
+import json
+import threading
+
+
+class MessageConsumer(threading.Thread):
+    """
+    MessageConsumer lets RabbitMQ push the messages of the queue, instead of polling it and sleeping when it is empty.
+    The blocking consumer runs in its own thread, which is the only one using the connection,
+    and hands the messages over to an asyncio queue. A message is only acknowledged once it is handed over,
+    and the broker never pushes more than one unacknowledged message, so the queue size bounds the backlog.
+    """
+
+    def __init__(self, rabbitmq, loop, queue_size=1, inactivity_timeout=1.0):
+        """
+        Constructor.
+
+        Args:
+            rabbitmq: Connected RabbitMQ message broker.
+            loop: The event loop awaiting the messages.
+            queue_size: Number of received messages waiting to be processed.
+            inactivity_timeout: Seconds between checks to stop when no message arrives.
+        """
+        super().__init__(daemon=True)
+        self.rabbitmq = rabbitmq
+        self.loop = loop
+        self.inactivity_timeout = inactivity_timeout
+        self.messages = asyncio.Queue(maxsize=max(queue_size, 1))
+        self._stopped = threading.Event()
+
+    def run(self):
+        """
+        Consume the queue until stopped, errors are handed over to the awaiting side.
+        """
+        try:
+            channel = self.rabbitmq.readChannel
+            channel.basic_qos(prefetch_count=1)
+            for method, _, body in channel.consume(self.rabbitmq.queue_name,
+                                                   inactivity_timeout=self.inactivity_timeout):
+                if self._stopped.is_set():
+                    break
+                if method is None:
+                    continue  # No message within the inactivity timeout
+
+                if not self.__hand_over__(json.loads(body)):
+                    break
+                channel.basic_ack(method.delivery_tag)
+            channel.cancel()
+        except Exception as e:
+            self.__hand_over__(e)
+
+    async def get(self):
+        """
+        Wait for the next message pushed by the broker.
+
+        Returns:
+            dict: The message.
+        """
+        message = await self.messages.get()
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    def stop(self):
+        """
+        Stop consuming, the unacknowledged message is redelivered by the broker.
+        """
+        self._stopped.set()
+
+    def __hand_over__(self, message):
+        """
+        Put a message on the asyncio queue, meanwhile the connection keeps serving heartbeats.
+
+        Args:
+            message: The message, or the error of the consumer.
+
+        Returns:
+            bool: True if the message is handed over, False if the consumer is stopped first.
+        """
+        handed_over = asyncio.run_coroutine_threadsafe(self.messages.put(message), self.loop)
+        while not self._stopped.is_set():
+            try:
+                handed_over.result(timeout=self.inactivity_timeout)
+                return True
+            except concurrent.futures.TimeoutError:
+                self.rabbitmq.connection.process_data_events(time_limit=0)
+        handed_over.cancel()
+        return False
@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+
+
+class MotionFilter:
+    """
+    Cheap scene-change check ahead of the models. A downscaled and blurred grayscale version of every sampled frame
+    is compared with the one of the last evaluated frame, the frame is only evaluated when enough pixels changed.
+    """
+
+    CHANGED = 'changed'
+    REFRESH = 'refresh'
+    UNCHANGED = 'unchanged'
+
+    def __init__(self, threshold, pixel_threshold=25, max_skipped=10, width=160):
+        """
+        Constructor.
+
+        Args:
+            threshold: Minimum fraction (0-1) of changed pixels to evaluate a frame.
+            pixel_threshold: Minimum difference in gray level (0-255) of a changed pixel.
+            max_skipped: Evaluate a frame after this many skipped frames in a row anyway (0 = no limit).
+            width: Width of the downscaled frames that are compared.
+        """
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.max_skipped = max_skipped
+        self.width = width
+        self.evaluated_frames = 0
+        self.skipped_frames = 0
+        self._reference = None
+        self._skipped_in_a_row = 0
+
+    def reset(self):
+        """
+        Forget the last evaluated frame and the counters, e.g. when the next video is opened.
+        """
+        self.evaluated_frames = 0
+        self.skipped_frames = 0
+        self._reference = None
+        self._skipped_in_a_row = 0
+
+    def check(self, frame):
+        """
+        Compare a frame with the last evaluated frame, if it has to be evaluated it becomes the last evaluated frame.
+
+        Args:
+            frame: The BGR frame.
+
+        Returns:
+            str: CHANGED if the scene changed, REFRESH if the frame is evaluated without a change (the first frame,
+                 or after max_skipped frames), UNCHANGED if the frame can be skipped.
+        """
+        thumbnail = self.__thumbnail__(frame)
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            status = self.REFRESH
+        elif self.change(self._reference, thumbnail, self.pixel_threshold) >= self.threshold:
+            status = self.CHANGED
+        elif 0 < self.max_skipped <= self._skipped_in_a_row:
+            status = self.REFRESH
+        else:
+            status = self.UNCHANGED
+
+        if status == self.UNCHANGED:
+            self._skipped_in_a_row += 1
+            self.skipped_frames += 1
+        else:
+            self._reference = thumbnail
+            self._skipped_in_a_row = 0
+            self.evaluated_frames += 1
+        return status
+
+    def has_changed(self, frame):
+        """
+        Check if a frame has to be evaluated, see check.
+
+        Args:
+            frame: The BGR frame.
+
+        Returns:
+            bool: True if the frame has to be evaluated.
+        """
+        return self.check(frame) != self.UNCHANGED
+
+    @property
+    def skip_rate(self):
+        """
+        Fraction of the checked frames that were skipped.
+        """
+        checked_frames = self.evaluated_frames + self.skipped_frames
+        return self.skipped_frames / checked_frames if checked_frames else 0.0
+
+    @staticmethod
+    def change(reference, thumbnail, pixel_threshold):
+        """
+        Fraction of the pixels of two thumbnails that differ more than pixel_threshold gray levels.
+        """
+        return np.count_nonzero(cv2.absdiff(reference, thumbnail) > pixel_threshold) / thumbnail.size
+
+    def __thumbnail__(self, frame):
+        """
+        Downscaled, blurred grayscale version of a frame, the blur suppresses sensor noise and compression artefacts.
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        height = max(round(gray.shape[0] * self.width / gray.shape[1]), 1)
+        thumbnail = cv2.resize(gray, (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(thumbnail, (5, 5), 0)
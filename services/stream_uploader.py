@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import wait
+
+
+class StreamUploader:
+    """
+    Uploads the files of a dataset while the video is still being evaluated.
+    The export reports every file it saved, which is handed to the integration to be uploaded in the background.
+    """
+
+    def __init__(self, integration):
+        """
+        Constructor.
+
+        Args:
+            integration: The integration uploading the files, it has to support upload_files.
+        """
+        self.integration = integration
+        self._lock = threading.Lock()
+        self._uploads = []
+
+    @staticmethod
+    def supports(integration):
+        """
+        Check if an integration can upload single files.
+
+        Args:
+            integration: The integration to check.
+
+        Returns:
+            bool: True if the files can be uploaded one by one.
+        """
+        return callable(getattr(integration, 'upload_files', None))
+
+    def submit(self, src_project_path, source_paths):
+        """
+        Start uploading saved files, used as saved_callback of the export.
+
+        Args:
+            src_project_path: The dataset directory of the files.
+            source_paths: Paths of the saved files.
+        """
+        uploads = self.integration.upload_files(src_project_path, source_paths)
+        with self._lock:
+            self._uploads += uploads
+
+    def wait(self):
+        """
+        Wait until all submitted files are uploaded. Files that failed are kept and uploaded with the rest of the dataset.
+
+        Returns:
+            int: The number of uploaded files.
+        """
+        with self._lock:
+            uploads, self._uploads = self._uploads, []
+        wait(uploads)
+
+        uploaded = [upload.result() for upload in uploads].count(True)
+        if uploaded < len(uploads):
+            print(f'Failed to stream {len(uploads) - uploaded} of {len(uploads)} files, retrying after the video')
+        return uploaded
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class VaultClient:
+    """
+    VaultClient retrieves and deletes media of Kerberos Vault over a persistent keep-alive session,
+    with timeouts and bounded retries. Deletes can be deferred and flushed in groups.
+    """
+
+    def __init__(self, storage_uri, storage_access_key, storage_secret_key,
+                 timeout=60, max_retries=3, pool_size=4, delete_batch_size=1, delete_flush_interval=30):
+        """
+        Constructor.
+
+        Args:
+            storage_uri: The URI of Kerberos Vault.
+            storage_access_key: The access key of Kerberos Vault.
+            storage_secret_key: The secret key of Kerberos Vault.
+            timeout: Seconds to wait for the connection and for every read of the response.
+            max_retries: Number of retries of a request failing with a connection error or a 429/5xx response.
+            pool_size: Number of kept-alive connections, and of deletes sent at once when flushing.
+            delete_batch_size: Number of deletes collected before they are sent (1 = send right away).
+            delete_flush_interval: Seconds after which collected deletes are sent, even if the batch is not full.
+        """
+        self.storage_uri = storage_uri
+        self.storage_access_key = storage_access_key
+        self.storage_secret_key = storage_secret_key
+        self.timeout = timeout
+        self.pool_size = max(pool_size, 1)
+        self.delete_batch_size = delete_batch_size
+        self.delete_flush_interval = delete_flush_interval
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'DELETE'}),
+            raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._pending_deletes = []
+        self._last_flush = time.time()
+
+    def retrieve_media(self, message, media_savepath):
+        """
+        Download the media of a message. Storage information in the message data overrides the configured one.
+
+        Args:
+            message: The message containing the key and source of the media.
+            media_savepath: Path to save the media to.
+
+        Returns:
+            bool: True if the media is saved under media_savepath.
+        """
+        storage_uri, headers = self.__request__(message['payload']['key'], message['source'], message.get('data'))
+        try:
+            with self.session.get(f'{storage_uri}/storage/blob', headers=headers,
+                                  timeout=self.timeout, stream=True) as response:
+                if response.status_code != 200:
+                    print(f'Failed to fetch media from storage: {response.status_code}')
+                    return False
+
+                # Write to a temporary file, so an interrupted download never leaves a truncated video behind.
+                with open(f'{media_savepath}.part', 'wb') as output:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        output.write(chunk)
+            os.replace(f'{media_savepath}.part', media_savepath)
+            return True
+        except (requests.RequestException, OSError) as e:
+            print(f'Error occurred while trying to fetch data from storage: {e}')
+            return False
+
+    def delete_media(self, media_key, provider):
+        """
+        Delete media from Kerberos Vault, or collect the delete until the batch is full or the flush interval passed.
+
+        Args:
+            media_key: The key of the media to delete.
+            provider: The provider of the media.
+        """
+        if self.delete_batch_size <= 1:
+            self.__delete__(media_key, provider)
+            return
+
+        with self._lock:
+            self._pending_deletes.append((media_key, provider))
+            flush = (len(self._pending_deletes) >= self.delete_batch_size
+                     or time.time() - self._last_flush >= self.delete_flush_interval)
+        if flush:
+            self.flush_deletes()
+
+    def flush_deletes(self):
+        """
+        Send the collected deletes, several at once over the pooled connections.
+
+        Returns:
+            int: The number of deleted media.
+        """
+        with self._lock:
+            deletes, self._pending_deletes = self._pending_deletes, []
+            self._last_flush = time.time()
+        if not deletes:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(deletes))) as executor:
+            deleted = list(executor.map(lambda delete: self.__delete__(*delete), deletes))
+        print(f'Deleted {deleted.count(True)} of {len(deletes)} media from {self.storage_uri}')
+        return deleted.count(True)
+
+    def __delete__(self, media_key, provider):
+        """
+        Delete a single media from Kerberos Vault.
+
+        Returns:
+            bool: True if the media is deleted.
+        """
+        storage_uri, headers = self.__request__(media_key, provider)
+        try:
+            response = self.session.delete(f'{storage_uri}/storage', headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f'Something went wrong while deleting {media_key}: {e}')
+            return False
+
+        if response.status_code != 200:
+            print(f'Something went wrong while deleting {media_key}: {response.status_code} {response.text}')
+            return False
+        print(f'Delete {media_key} from {storage_uri}')
+        return True
+
+    def __request__(self, media_key, provider, data=None):
+        """
+        Storage URI and headers of a request for a media.
+
+        Args:
+            media_key: The key of the media.
+            provider: The provider of the media.
+            data: Optional storage information of a message (storage_uri, storage_access_key, storage_secret).
+
+        Returns:
+            tuple: The storage URI and the headers.
+        """
+        data = data or {}
+        storage_uri = data.get('storage_uri') or self.storage_uri
+        headers = {
+            'X-Kerberos-Storage-FileName': media_key,
+            'X-Kerberos-Storage-Provider': provider,
+            'X-Kerberos-Storage-AccessKey': data.get('storage_access_key') or self.storage_access_key,
+            'X-Kerberos-Storage-SecretAccessKey': data.get('storage_secret') or self.storage_secret_key,
+        }
+        return storage_uri, headers
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import numpy as np
+from ultralytics.trackers.basetrack import BaseTrack
+from ultralytics.trackers.bot_sort import BOTSORT
+from ultralytics.utils import IterableSimpleNamespace, yaml_load
+from ultralytics.utils.checks import check_yaml
+
+from projects.base_project import BaseProject
+
+
+def tracker():
+    return BOTSORT(args=IterableSimpleNamespace(**yaml_load(check_yaml('botsort.yaml'))), frame_rate=30)
+
+
+def update(tracker, boxes):
+    """
+    Let the tracker take a frame with the given detections as rows of x1, y1, x2, y2, conf, cls.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32)
+    results = SimpleNamespace(xyxy=boxes[:, :4], xywh=np.concatenate([(boxes[:, :2] + boxes[:, 2:4]) / 2,
+                                                                      boxes[:, 2:4] - boxes[:, :2]], axis=1),
+                              conf=boxes[:, 4], cls=boxes[:, 5])
+    return tracker.update(results, np.zeros((64, 64, 3), dtype=np.uint8))
+
+
+def test_reset_models_keeps_the_track_ids_of_other_workers_unique():
+    worker_trackers = [tracker(), tracker()]
+    projects = []
+    for worker_tracker in worker_trackers:
+        project = BaseProject()
+        project.models = [SimpleNamespace(predictor=SimpleNamespace(trackers=[worker_tracker]))]
+        projects.append(project)
+
+    boxes = [[10, 10, 20, 20, 0.9, 0], [30, 30, 40, 40, 0.9, 0]]
+    for _ in range(2):
+        update(worker_trackers[0], boxes)
+    ids = [track.track_id for track in worker_trackers[0].tracked_stracks]
+
+    # The second worker finishes a video while the first one is still tracking.
+    update(worker_trackers[1], boxes)
+    projects[1].reset_models()
+    assert worker_trackers[1].tracked_stracks == [] and worker_trackers[1].frame_id == 0
+    assert BaseTrack._count >= max(ids)
+
+    update(worker_trackers[0], boxes + [[50, 10, 60, 20, 0.9, 0]])
+    new_ids = [track.track_id for track in worker_trackers[0].tracked_stracks]
+    assert len(set(new_ids)) == 3 and set(ids) < set(new_ids)
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import condition
+
+
+class FakeResults:
+    """
+    Stand-in of ultralytics Results, only the boxes are used when merging.
+    """
+
+    def __init__(self, xywhn, cls, conf):
+        xywhn = np.asarray(xywhn, dtype=np.float32).reshape(-1, 4)
+        xyxy = np.concatenate([xywhn[:, :2] - xywhn[:, 2:] / 2, xywhn[:, :2] + xywhn[:, 2:] / 2], axis=1) * 640
+        boxes = SimpleNamespace(xywhn=xywhn, xyxy=xyxy, cls=np.asarray(cls, dtype=np.float32),
+                                conf=np.asarray(conf, dtype=np.float32))
+        self.boxes = SimpleNamespace(cpu=lambda: SimpleNamespace(numpy=lambda: boxes))
+
+
+class FakeProject:
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def map_to_first_model(self, index, cls):
+        return self.mapping.get(cls)
+
+
+def baseline_merge(project, total_results):
+    """
+    The merge of the model results before it was vectorised: boxes are sorted on their class and every box
+    is dropped when a kept box of the same class has its centre within 0.01.
+    """
+    combined_results = []
+    for index, results in enumerate(total_results):
+        boxes = results.boxes.cpu().numpy()
+        for xywhn, xyxy, cls, conf in zip(boxes.xywhn, boxes.xyxy, boxes.cls, boxes.conf):
+            combined_results.append((xywhn, xyxy, cls if index == 0 else project.map_to_first_model(index, cls), conf))
+
+    kept = []
+    for element in sorted(combined_results, key=lambda x: x[2], reverse=True):
+        if not any(res[2] == element[2] and abs(res[0][0] - element[0][0]) < 0.01
+                   and abs(res[0][1] - element[0][1]) < 0.01 for res in kept):
+            kept.append(element)
+    return kept
+
+
+def fixture(seed):
+    random = np.random.default_rng(seed)
+    total_results = []
+    for _ in range(2):
+        number_of_boxes = int(random.integers(0, 12))
+        # Few distinct centres, so most fixtures hold duplicates within and across the models.
+        centres = random.choice([0.2, 0.205, 0.5, 0.8], size=(number_of_boxes, 2))
+        sizes = random.uniform(0.05, 0.2, size=(number_of_boxes, 2))
+        total_results.append(FakeResults(np.concatenate([centres, sizes], axis=1),
+                                         random.integers(0, 3, size=number_of_boxes),
+                                         random.uniform(0.2, 1, size=number_of_boxes)))
+    return total_results
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_merge_keeps_the_labels_of_the_baseline(monkeypatch, seed):
+    monkeypatch.setattr(condition.var, 'DUPLICATE_SUPPRESSION', 'center')
+    monkeypatch.setattr(condition.var, 'DUPLICATE_KEEP', 'first')
+    project = FakeProject({0.0: 2.0, 1.0: 1.0, 2.0: 0.0})
+    total_results = fixture(seed)
+
+    xywhn, xyxy, cls, conf = condition.__merge_results__(project, total_results)
+    expected = baseline_merge(project, total_results)
+    np.testing.assert_array_equal(cls, [element[2] for element in expected])
+    np.testing.assert_array_equal(xywhn.reshape(-1, 4), np.reshape([element[0] for element in expected], (-1, 4)))
+    np.testing.assert_array_equal(conf, [element[3] for element in expected])
+
+
+def test_merge_keeps_the_most_confident_duplicate(monkeypatch):
+    monkeypatch.setattr(condition.var, 'DUPLICATE_SUPPRESSION', 'center')
+    total_results = [FakeResults([[0.5, 0.5, 0.1, 0.1], [0.505, 0.5, 0.2, 0.2], [0.2, 0.2, 0.1, 0.1]],
+                                 [0, 0, 1], [0.4, 0.9, 0.5])]
+
+    monkeypatch.setattr(condition.var, 'DUPLICATE_KEEP', 'first')
+    _, _, cls, conf = condition.__merge_results__(FakeProject({}), total_results)
+    np.testing.assert_allclose(conf, [0.5, 0.4])
+
+    monkeypatch.setattr(condition.var, 'DUPLICATE_KEEP', 'confidence')
+    _, _, cls, conf = condition.__merge_results__(FakeProject({}), total_results)
+    np.testing.assert_array_equal(cls, [1, 0])
+    np.testing.assert_allclose(conf, [0.5, 0.9])
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+from exports.frame_naming import frame_name
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_names_within_a_process_are_unique():
+    names = {frame_name('camera/recording.mp4', 12) for _ in range(100)}
+    assert len(names) == 100
+    assert all(name.startswith('camera_recording_000012_') for name in names)
+
+
+def test_reprocessed_video_gets_new_names():
+    # A restarted process counts from zero again, the first frame it names must not overwrite the previous run.
+    script = "from exports.frame_naming import frame_name; print(frame_name('camera/recording.mp4', 12))"
+    names = {subprocess.check_output([sys.executable, '-c', script], cwd=REPOSITORY, text=True).strip()
+             for _ in range(2)}
+    assert len(names) == 2
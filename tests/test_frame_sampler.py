@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import pytest
+
+from services.frame_producer import FrameProducer, FrameSampler
+from services.harvest_service import HarvestService
+
+
+class FakeCapture:
+    """
+    Stand-in of cv2.VideoCapture, every decoded frame is filled with its frame number.
+    """
+
+    def __init__(self, number_of_frames):
+        self.number_of_frames = number_of_frames
+        self.position = 0
+        self.decoded = 0
+
+    def grab(self):
+        if self.position >= self.number_of_frames:
+            return False
+        self.position += 1
+        return True
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        self.decoded += 1
+        return True, np.full((4, 4, 3), self.position % 256, dtype=np.uint8)
+
+
+def read_frames(sampler, number_of_frames=600, interesting=()):
+    """
+    Run HarvestService.__read_frames__ over a fake capture, the sampler observes every yielded frame.
+
+    Returns:
+        tuple: The sampled frame numbers and the fake capture.
+    """
+    service = HarvestService()
+    service.frame_number = 0
+    service.skip_until = 0
+    service.max_frame_number = number_of_frames
+    service.sampler = sampler
+    capture = FakeCapture(number_of_frames)
+
+    frame_numbers = []
+    for frame_number, frame in service.__read_frames__(capture):
+        assert frame[0, 0, 0] == frame_number % 256
+        frame_numbers.append(frame_number)
+        sampler.observe(frame_number in interesting)
+    return frame_numbers, capture
+
+
+def test_uniform_sampling():
+    frame_numbers, capture = read_frames(FrameSampler(6, 600))
+    assert frame_numbers == list(range(6, 601, 6))
+    assert capture.decoded == 100
+
+
+def test_max_stride_backs_off_through_empty_stretches():
+    frame_numbers, _ = read_frames(FrameSampler(6, 600, max_stride=4))
+    # The stride doubles after every uninteresting frame: 6, 12, then 24 at most.
+    assert frame_numbers == [6, 18] + list(range(42, 601, 24))
+
+
+def test_densify_around_interesting_frames():
+    frame_numbers, _ = read_frames(FrameSampler(6, 600, max_stride=4, densify=2), interesting={93})
+    assert frame_numbers[:6] == [3, 9, 21, 45, 69, 93]
+    # After the detection in frame 93 the sampler falls back to the dense stride.
+    index = frame_numbers.index(93)
+    assert frame_numbers[index + 1] - frame_numbers[index] == 3
+
+
+def test_densify_without_detections():
+    frame_numbers, _ = read_frames(FrameSampler(6, 600, densify=2))
+    assert frame_numbers == [3] + list(range(9, 601, 6))
+
+
+@pytest.mark.parametrize('budget', [10, 50])
+def test_budget_is_spread_over_the_video(budget):
+    sampler = FrameSampler(6, 600, budget=budget)
+    frame_numbers, _ = read_frames(sampler)
+    assert frame_numbers == list(range(600 // budget, 601, 600 // budget))
+    assert sampler.sampled_frames == budget
+
+
+def test_frames_dropped_after_a_detection_keep_their_budget():
+    sampler = FrameSampler(6, 600, budget=10)
+    producer = FrameProducer(FakeCapture(600), 6, 600, queue_size=4, sampler=sampler)
+    producer.start()
+
+    frame_numbers = []
+    for frame_number, _ in producer:
+        if not frame_numbers:
+            # Wait until the frames after the detection are decoded ahead, they are dropped by skip_until.
+            while producer._queue.qsize() < 4:
+                time.sleep(0.01)
+            producer.skip_until(300)
+        frame_numbers.append(frame_number)
+        sampler.observe(frame_number == 60)
+    producer.stop()
+
+    assert frame_numbers[0] == 60
+    assert all(frame_number > 300 for frame_number in frame_numbers[1:])
+    # Only the evaluated frames count towards the budget, the dropped ones are spread over the rest of the video.
+    assert sampler.sampled_frames == len(frame_numbers)
+    assert len(frame_numbers) >= 9
@@ -0,0 +1,34 @@
+from collections import Counter
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from services.harvest_service import HarvestService
+from services.motion_filter import MotionFilter
+
+
+def test_open_video_resets_the_counters_of_the_previous_video(tmp_path):
+    video_path = str(tmp_path / 'recording.mp4')
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+    for value in range(30):
+        writer.write(np.full((48, 64, 3), value, dtype=np.uint8))
+    writer.release()
+
+    service = HarvestService()
+    service.project = SimpleNamespace(temp_path=video_path, stage_rejections=Counter())
+    service.motion_filter = MotionFilter(0.01)
+    service.open_video(media_savepath=video_path).release()
+
+    # Counters of the first video.
+    service.predicted_frames = 5
+    service.duplicate_frames = 2
+    service.project.stage_rejections.update({0: 4, 1: 1})
+    service.motion_filter.skipped_frames = 3
+
+    cap = service.open_video(media_savepath=video_path)
+    cap.release()
+    assert (service.frame_number, service.predicted_frames, service.duplicate_frames) == (0, 0, 0)
+    assert service.project.stage_rejections == Counter()
+    assert service.motion_filter.skipped_frames == 0
+    assert service.max_frame_number == 30
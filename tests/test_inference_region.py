@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+import torch
+from ultralytics.engine.results import Results
+
+from utils.InferenceRegion import InferenceRegion
+
+NAMES = {0: 'person', 1: 'car'}
+
+
+def frame(height=100, width=200):
+    return np.full((height, width, 3), 255, dtype=np.uint8)
+
+
+def results(image, boxes):
+    """
+    Results of a view, boxes are rows of x1, y1, x2, y2, conf, cls in view coordinates.
+    """
+    return Results(orig_img=image, path='frame.jpg', names=NAMES,
+                   boxes=torch.tensor(boxes, dtype=torch.float32).reshape(-1, 6))
+
+
+def test_without_roi_and_tiles_there_is_no_region():
+    assert InferenceRegion.from_config({}) is None
+    region = InferenceRegion.from_config({'tiles': [1, 2], 'tile_overlap': 0.2})
+    assert (region.rows, region.columns, region.tile_overlap) == (1, 2, 0.2)
+
+
+def test_rectangle_roi_is_cropped():
+    region = InferenceRegion(roi=[[0.25, 0.5, 0.75, 1.0]])
+    (view, offset), = region.views(frame())
+    assert offset == (50, 50)
+    assert view.shape == (50, 100, 3)
+    mask, rectangle = region.__mask__((100, 200))
+    assert mask is None
+    assert rectangle == (50, 50, 150, 100)
+
+
+def test_polygon_roi_is_masked():
+    # Triangle with its corners at the top left, top right and bottom left of the bounding rectangle.
+    region = InferenceRegion(roi=[[[0.0, 0.0], [0.5, 0.0], [0.0, 1.0]]])
+    (view, offset), = region.views(frame())
+    assert offset == (0, 0)
+    assert view.shape == (100, 100, 3)
+    assert view[5, 5].tolist() == [255, 255, 255]
+    assert view[95, 95].tolist() == [0, 0, 0]
+
+
+def test_invalid_configuration():
+    with pytest.raises(TypeError):
+        InferenceRegion(roi=[[0.1, 0.2]])
+    with pytest.raises(TypeError):
+        InferenceRegion(tiles=[0, 2])
+
+
+def test_tiles_overlap_and_cover_the_frame():
+    region = InferenceRegion(tiles=[2, 2], tile_overlap=0.1)
+    views = region.views(frame())
+    # Tiles of ceil(100 / 1.9) x ceil(200 / 1.9) pixels, the last row and column end at the frame border.
+    assert [offset for _, offset in views] == [(0, 0), (94, 0), (0, 47), (94, 47)]
+    assert all(view.shape == (53, 106, 3) for view, _ in views)
+
+
+def test_tile_boxes_are_mapped_to_frame_coordinates():
+    image = frame()
+    region = InferenceRegion(roi=[[0.25, 0.5, 1.0, 1.0]], tiles=[1, 2], tile_overlap=0.0)
+    views = region.views(image)
+    assert [offset for _, offset in views] == [(50, 50), (125, 50)]
+
+    merged = region.to_frame(image, [results(views[0][0], [[10, 10, 20, 20, 0.9, 0]]),
+                                     results(views[1][0], [[30, 5, 40, 25, 0.8, 1]])],
+                             [offset for _, offset in views])
+    assert merged.orig_img is image
+    assert merged.boxes.xyxy.tolist() == [[60, 60, 70, 70], [155, 55, 165, 75]]
+    assert merged.boxes.cls.tolist() == [0, 1]
+
+
+def test_boxes_of_the_same_object_in_different_tiles_are_merged():
+    image = frame()
+    region = InferenceRegion(tiles=[1, 2], tile_overlap=0.2)
+    views = region.views(image)
+    offsets = [offset for _, offset in views]
+    # Tiles of ceil(200 / 1.8) = 112 pixels wide, overlapping from x = 88 to 112.
+    assert offsets == [(0, 0), (88, 0)]
+
+    merged = region.to_frame(image, [
+        # The left part of a person that is cut by the border of the first tile, and a car.
+        results(views[0][0], [[80, 10, 112, 50, 0.9, 0], [10, 60, 30, 80, 0.7, 1]]),
+        # The right part of the person, and a second person that stays separate.
+        results(views[1][0], [[0, 12, 42, 48, 0.6, 0], [62, 10, 82, 50, 0.8, 0]]),
+    ], offsets)
+
+    boxes = sorted(merged.boxes.data.tolist(), key=lambda box: -box[4])
+    assert [box[:4] for box in boxes] == [[80, 10, 130, 50], [150, 10, 170, 50], [10, 60, 30, 80]]
+    # The merged box keeps the confidence and class of the most confident part.
+    assert [box[4:] for box in boxes] == [pytest.approx([0.9, 0]), pytest.approx([0.8, 0]), pytest.approx([0.7, 1])]
+
+
+def test_boxes_of_the_same_tile_are_not_merged():
+    image = frame()
+    region = InferenceRegion(tiles=[1, 2], tile_overlap=0.0)
+    views = region.views(image)
+    merged = region.to_frame(image, [results(views[0][0], [[10, 10, 50, 50, 0.9, 0], [12, 12, 48, 48, 0.5, 0]]),
+                                     results(views[1][0], [])],
+                             [offset for _, offset in views])
+    assert len(merged.boxes) == 2
+
+
+def test_boxes_with_their_centre_outside_the_polygon_are_dropped():
+    image = frame()
+    region = InferenceRegion(roi=[[[0.0, 0.0], [0.5, 0.0], [0.0, 1.0]]])
+    (view, offset), = region.views(image)
+    merged = region.to_frame(image, [results(view, [[5, 5, 25, 25, 0.9, 0], [70, 70, 90, 90, 0.9, 0]])], [offset])
+    assert merged.boxes.xyxy.tolist() == [[5, 5, 25, 25]]
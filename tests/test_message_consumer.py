@@ -0,0 +1,136 @@
+import asyncio
+import collections
+import json
+import time
+from types import SimpleNamespace
+
+from services.message_consumer import MessageConsumer
+
+
+class FakeChannel:
+    """
+    Stand-in of a pika BlockingChannel on a queue of the broker. Like RabbitMQ, it does not deliver more messages
+    than the prefetch count until they are acknowledged, and redelivers the unacknowledged messages on cancel.
+    """
+
+    def __init__(self, messages):
+        self.queue = collections.deque(json.dumps(message).encode() for message in messages)
+        self.prefetch_count = 0
+        self.unacked = {}
+        self.acked = []
+        self.max_unacked = 0
+        self.cancelled = False
+        self._delivery_tag = 0
+
+    def basic_qos(self, prefetch_count):
+        self.prefetch_count = prefetch_count
+
+    def consume(self, queue_name, inactivity_timeout):
+        while True:
+            if self.queue and (not self.prefetch_count or len(self.unacked) < self.prefetch_count):
+                self._delivery_tag += 1
+                body = self.queue.popleft()
+                self.unacked[self._delivery_tag] = body
+                self.max_unacked = max(self.max_unacked, len(self.unacked))
+                yield SimpleNamespace(delivery_tag=self._delivery_tag), None, body
+            else:
+                time.sleep(inactivity_timeout)
+                yield None, None, None
+
+    def basic_ack(self, delivery_tag):
+        self.acked.append(json.loads(self.unacked.pop(delivery_tag)))
+
+    def cancel(self):
+        self.cancelled = True
+        self.queue.extendleft(reversed(list(self.unacked.values())))
+        self.unacked.clear()
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.processed_data_events = 0
+
+    def process_data_events(self, time_limit=None):
+        self.processed_data_events += 1
+
+
+def broker(messages):
+    return SimpleNamespace(readChannel=FakeChannel(messages), connection=FakeConnection(), queue_name='queue')
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        await asyncio.sleep(0.01)
+
+
+def consume(rabbitmq, test):
+    async def main():
+        consumer = MessageConsumer(rabbitmq, asyncio.get_running_loop(), inactivity_timeout=0.01)
+        consumer.start()
+        try:
+            await test(consumer, rabbitmq.readChannel)
+        finally:
+            consumer.stop()
+            await asyncio.get_running_loop().run_in_executor(None, consumer.join, 2.0)
+        assert not consumer.is_alive()
+    asyncio.run(main())
+
+
+def test_messages_are_acknowledged_once_handed_over():
+    rabbitmq = broker([{'id': 1}, {'id': 2}, {'id': 3}])
+
+    async def test(consumer, channel):
+        # The first message fills the asyncio queue, the second one waits for room and is not acknowledged.
+        await wait_for(lambda: channel.acked == [{'id': 1}] and len(channel.unacked) == 1)
+        await asyncio.sleep(0.1)
+        assert channel.acked == [{'id': 1}]
+        assert rabbitmq.connection.processed_data_events > 0
+
+        assert await consumer.get() == {'id': 1}
+        await wait_for(lambda: channel.acked == [{'id': 1}, {'id': 2}])
+        assert await consumer.get() == {'id': 2}
+        assert await consumer.get() == {'id': 3}
+        await wait_for(lambda: channel.acked == [{'id': 1}, {'id': 2}, {'id': 3}])
+
+    consume(rabbitmq, test)
+
+
+def test_prefetch_is_one():
+    rabbitmq = broker([{'id': index} for index in range(5)])
+
+    async def test(consumer, channel):
+        for index in range(5):
+            assert await consumer.get() == {'id': index}
+        await wait_for(lambda: len(channel.acked) == 5)
+        assert channel.prefetch_count == 1
+        assert channel.max_unacked == 1
+
+    consume(rabbitmq, test)
+
+
+def test_unacknowledged_message_is_redelivered_after_stop():
+    rabbitmq = broker([{'id': 1}, {'id': 2}])
+
+    async def test(consumer, channel):
+        # The first message is handed over, the second one waits for room in the asyncio queue.
+        await wait_for(lambda: channel.acked == [{'id': 1}] and len(channel.unacked) == 1)
+        consumer.stop()
+        await asyncio.get_running_loop().run_in_executor(None, consumer.join, 2.0)
+
+        assert channel.cancelled
+        assert channel.acked == [{'id': 1}]
+        assert list(channel.queue) == [json.dumps({'id': 2}).encode()]
+
+    consume(rabbitmq, test)
+
+    # The next consumer receives the message that was not handed over.
+    rabbitmq.readChannel.cancelled = False
+
+    async def test_next(consumer, channel):
+        assert await consumer.get() == {'id': 2}
+        await wait_for(lambda: channel.acked == [{'id': 1}, {'id': 2}])
+
+    consume(rabbitmq, test_next)
@@ -0,0 +1,58 @@
+import numpy as np
+
+import services.harvest_service as harvest_service
+from services.frame_producer import FrameSampler
+from services.harvest_service import HarvestService
+from services.motion_filter import MotionFilter
+
+
+def frame(value):
+    return np.full((90, 160, 3), value, dtype=np.uint8)
+
+
+class StaticCapture:
+    """
+    Stand-in of cv2.VideoCapture of a static scene.
+    """
+
+    def __init__(self, number_of_frames):
+        self.remaining = number_of_frames
+
+    def grab(self):
+        self.remaining -= 1
+        return self.remaining >= 0
+
+    def read(self):
+        return self.grab(), frame(0)
+
+
+def test_check_separates_scene_changes_from_forced_evaluations():
+    motion_filter = MotionFilter(0.01, max_skipped=2)
+    statuses = [motion_filter.check(frame(value)) for value in (0, 0, 0, 0, 200, 200)]
+    assert statuses == [MotionFilter.REFRESH, MotionFilter.UNCHANGED, MotionFilter.UNCHANGED,
+                        MotionFilter.REFRESH, MotionFilter.CHANGED, MotionFilter.UNCHANGED]
+    assert (motion_filter.evaluated_frames, motion_filter.skipped_frames) == (3, 3)
+    assert motion_filter.has_changed(frame(0))
+
+
+def test_static_scene_lets_the_adaptive_sampler_back_off(monkeypatch):
+    evaluated = []
+
+    def process_frame(frame, project, cv2):
+        evaluated.append(service.frame_number)
+        return frame, [], frame, 0, False
+
+    monkeypatch.setattr(harvest_service, 'con_process_frame', process_frame)
+    service = HarvestService()
+    service.frame_number = 0
+    service.skip_until = 0
+    service.max_frame_number = 600
+    service.sampler = FrameSampler(6, 600, max_stride=4)
+    service.motion_filter = MotionFilter(0.01, max_skipped=1)
+
+    for _, image in service.__read_frames__(StaticCapture(600)):
+        service.__predict_frame__(image, 0)
+
+    # The first frame and the forced evaluations are no scene changes, the stride keeps growing to its maximum.
+    assert evaluated[:3] == [6, 42, 90]
+    assert service.sampler._stride == service.sampler.max_stride
@@ -0,0 +1,153 @@
+import os
+
+import pytest
+
+pytest.importorskip('roboflow')
+
+from integrations.roboflow import roboflow_integration  # noqa: E402
+from integrations.roboflow.roboflow_integration import RoboflowIntegration  # noqa: E402
+
+
+class FakeProject:
+    """
+    Stand-in of a Roboflow project, images are accepted unless their name says otherwise.
+    """
+
+    id = 'workspace/project'
+
+    def __init__(self):
+        self.integration = None
+        self.uploads = []
+
+    def single_upload(self, image_path, annotation_path, annotation_labelmap, num_retry_uploads, batch_name):
+        # The batch is uploaded without holding the lock, so videos can be added to the next batch meanwhile.
+        assert not self.integration._batch_lock.locked()
+        assert annotation_path and annotation_labelmap
+        self.uploads.append(os.path.basename(image_path))
+        if 'rejected' in image_path:
+            return {'error': {'message': 'Image rejected'}}
+        if 'unidentified' in image_path:
+            return {'image': {'duplicate': True}, 'annotation': None}
+        if 'unreachable' in image_path:
+            raise ConnectionError('Connection reset')
+        return {'image': {'id': 'image-id'}, 'annotation': {'success': True}}
+
+
+class FakeRoboflow:
+    fake_project = None
+
+    def __init__(self, api_key):
+        self.uploaded_datasets = []
+
+    def upload_dataset(self, dataset_path, project_id, **kwargs):
+        self.uploaded_datasets.append(dataset_path)
+
+    def workspace(self, name):
+        return self
+
+    def project(self, name):
+        return FakeRoboflow.fake_project
+
+
+@pytest.fixture
+def integration(monkeypatch, tmp_path):
+    monkeypatch.setenv('RBF_BATCH_SIZE', '4')
+    monkeypatch.setenv('RBF_UPLOAD_WORKERS', '2')
+    monkeypatch.setenv('UPLOAD_JOURNAL', str(tmp_path / 'journal.db'))
+    FakeRoboflow.fake_project = FakeProject()
+    monkeypatch.setattr(roboflow_integration.roboflow, 'Roboflow', FakeRoboflow)
+
+    integration = RoboflowIntegration('roboflow')
+    integration.batch_dir = str(tmp_path / 'roboflow-batch')
+    integration.uploading_dir = str(tmp_path / 'roboflow-uploading')
+    integration._pending_images = 0
+    FakeRoboflow.fake_project.integration = integration
+    return integration
+
+
+def dataset(path, names):
+    """
+    Write a dataset in the layout of the exports: images, labels with the same name, and the label map.
+    """
+    os.makedirs(path / 'images')
+    os.makedirs(path / 'labels')
+    (path / 'data.yaml').write_text('names: [person]\n')
+    for name in names:
+        (path / 'images' / f'{name}.png').write_bytes(name.encode())
+        (path / 'labels' / f'{name}.txt').write_text('0 0.5 0.5 0.1 0.1\n')
+    return str(path)
+
+
+def files(directory):
+    return sorted(os.path.relpath(os.path.join(root, filename), directory)
+                  for root, _, filenames in os.walk(directory) for filename in filenames)
+
+
+def test_batch_waits_for_batch_size(integration, tmp_path):
+    integration.upload_dataset(dataset(tmp_path / 'video1', ['a', 'b']))
+
+    assert FakeRoboflow.fake_project.uploads == []
+    assert integration._pending_images == 2
+    assert files(integration.batch_dir) == ['data.yaml', 'images/a.png', 'images/b.png',
+                                            'labels/a.txt', 'labels/b.txt']
+    assert not os.path.exists(tmp_path / 'video1')
+
+
+def test_uploaded_images_are_removed_and_failed_images_kept(integration, tmp_path):
+    integration.upload_dataset(dataset(tmp_path / 'video1', ['a', 'rejected']))
+    integration.upload_dataset(dataset(tmp_path / 'video2', ['b', 'unidentified', 'unreachable']))
+
+    assert sorted(FakeRoboflow.fake_project.uploads) == ['a.png', 'b.png', 'rejected.png',
+                                                         'unidentified.png', 'unreachable.png']
+    assert files(integration.batch_dir) == [
+        'data.yaml',
+        'images/rejected.png', 'images/unidentified.png', 'images/unreachable.png',
+        'labels/rejected.txt', 'labels/unidentified.txt', 'labels/unreachable.txt']
+    assert os.listdir(integration.uploading_dir) == []
+    assert integration._pending_images == 3
+    assert integration.metrics == {'batches': 1, 'uploaded': 2, 'failed': 3}
+    metrics, = integration.batch_metrics
+    assert (metrics['images'], metrics['uploaded'], metrics['failed']) == (5, 2, 3)
+
+    journal = integration.journal
+    assert journal.uploaded_destination(integration.target, journal.file_hash(
+        os.path.join(integration.batch_dir, 'images', 'rejected.png'))) is None
+
+
+def test_failed_images_are_retried_in_the_next_batch(integration, tmp_path):
+    integration.upload_dataset(dataset(tmp_path / 'video1', ['a', 'b', 'c', 'rejected']))
+    FakeRoboflow.fake_project.uploads.clear()
+    integration.upload_dataset(dataset(tmp_path / 'video2', ['d', 'e', 'f']))
+
+    assert sorted(FakeRoboflow.fake_project.uploads) == ['d.png', 'e.png', 'f.png', 'rejected.png']
+    assert integration.metrics == {'batches': 2, 'uploaded': 6, 'failed': 2}
+    assert integration._pending_images == 1
+
+
+def test_without_batches_only_confirmed_images_are_journaled(integration, monkeypatch, tmp_path):
+    monkeypatch.setattr(integration._var, 'ROBOFLOW_BATCH_SIZE', 0)
+    dataset_path = dataset(tmp_path / 'video1', ['a', 'rejected'])
+    integration.upload_dataset(dataset_path)
+
+    # Roboflow confirmed a, the rejected image stays in the dataset and is not journaled.
+    assert sorted(FakeRoboflow.fake_project.uploads) == ['a.png', 'rejected.png']
+    assert integration.ws.uploaded_datasets == []
+    assert files(dataset_path) == ['data.yaml', 'images/rejected.png', 'labels/rejected.txt']
+    journal = integration.journal
+    assert journal.uploaded_destination(integration.target, journal.file_hash(
+        os.path.join(dataset_path, 'images', 'rejected.png'))) is None
+
+    # An image with the content of a uploaded before is skipped.
+    integration.upload_dataset(dataset(tmp_path / 'video2', ['a']))
+    assert sorted(FakeRoboflow.fake_project.uploads) == ['a.png', 'rejected.png']
+    assert not os.path.exists(tmp_path / 'video2')
+
+
+def test_without_batches_and_journal_the_dataset_is_uploaded_at_once(integration, monkeypatch, tmp_path):
+    monkeypatch.setattr(integration._var, 'ROBOFLOW_BATCH_SIZE', 0)
+    integration.journal = None
+    dataset_path = dataset(tmp_path / 'video1', ['a', 'b'])
+    integration.upload_dataset(dataset_path)
+
+    assert integration.ws.uploaded_datasets == [dataset_path]
+    assert not os.path.exists(dataset_path)
@@ -0,0 +1,39 @@
+from botocore.exceptions import ClientError
+
+from integrations.s3.s3_integration import S3Integration
+
+
+def client_error(status, code):
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'PutObject')
+
+
+def test_transient_errors():
+    assert S3Integration.__is_transient__(client_error(503, 'SlowDown'))
+    assert S3Integration.__is_transient__(client_error(400, 'RequestTimeout'))
+    assert S3Integration.__is_transient__(client_error(429, 'TooManyRequests'))
+    assert not S3Integration.__is_transient__(client_error(403, 'AccessDenied'))
+    assert not S3Integration.__is_transient__(FileNotFoundError('/tmp/missing.png'))
+
+
+def test_failed_upload_is_attempted_s3_max_attempts_times(monkeypatch, tmp_path):
+    # Nothing listens on the endpoint, every attempt fails with a connection error.
+    monkeypatch.setenv('INTEGRATION_NAME', 's3')
+    monkeypatch.setenv('S3_ENDPOINT', 'http://127.0.0.1:9')
+    monkeypatch.setenv('S3_ACCESS_KEY', 'access-key')
+    monkeypatch.setenv('S3_SECRET_KEY', 'secret-key')
+    monkeypatch.setenv('S3_BUCKET', 'bucket')
+    monkeypatch.setenv('S3_MAX_ATTEMPTS', '3')
+    monkeypatch.setenv('S3_RETRY_BACKOFF', '0')
+    monkeypatch.setenv('UPLOAD_JOURNAL', '')
+    monkeypatch.setattr(S3Integration, '__check_bucket_exists__', lambda self, bucket_name: True)
+    integration = S3Integration('s3')
+
+    requests = []
+    integration.agent.meta.events.register('before-send.s3.PutObject', lambda **kwargs: requests.append(1))
+    source_path = tmp_path / 'frame.png'
+    source_path.write_bytes(b'frame')
+
+    # The retries are left to S3_MAX_ATTEMPTS, botocore does not retry every attempt on its own.
+    assert not integration.__upload_file__(str(source_path), 'dataset/frame.png')
+    assert len(requests) == 3
+    assert source_path.exists()
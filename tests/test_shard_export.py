@@ -0,0 +1,57 @@
+import tarfile
+
+import cv2
+import numpy as np
+import pytest
+
+from exports.shard.shard_export import ShardExport
+
+# A recording key as written by the Kerberos Agent, with the tenant as directory.
+MEDIA_KEY = 'uugai-tenant/1715785200_6-967003_construction-site-north-gate-camera_200-200-400-400_24_769.mp4'
+
+
+@pytest.fixture
+def export(monkeypatch, tmp_path):
+    monkeypatch.setenv('DATASET_FORMAT', 'shard')
+    monkeypatch.setenv('DATASET_VERSION', '1')
+    monkeypatch.setenv('IMAGE_FORMAT', 'jpg')
+    export = ShardExport('shard')
+    export.proj_dir = str(tmp_path)
+    export.initialize_save_dir()
+    return export
+
+
+def shards(export):
+    return [shard['shard'] for shard in export._manifest]
+
+
+def test_long_media_keys_are_written(export):
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for frame_number in (12, 18):
+        export.save_frame(frame, 0, cv2, '0 0.5 0.5 0.1 0.1\n', frame, MEDIA_KEY, frame_number)
+    export.flush()
+
+    shard, = shards(export)
+    with tarfile.open(f'{export.result_dir_path}/{shard}') as tar:
+        names = tar.getnames()
+        assert len(names) == 6
+        assert all(len(name) > 100 for name in names)
+        label = next(name for name in names if name.endswith('.txt'))
+        assert tar.extractfile(label).read() == b'0 0.5 0.5 0.1 0.1\n'
+
+
+def test_samples_keep_their_members_together(export):
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    export.save_frame(frame, 0, cv2, '0 0.5 0.5 0.1 0.1\n', frame, 'camera.v2/recording.1715785200.mp4', 12)
+    export.flush()
+
+    shard, = shards(export)
+    with tarfile.open(f'{export.result_dir_path}/{shard}') as tar:
+        # WebDataset groups the members of a sample on the part of the name before the first dot.
+        samples = {}
+        for name in tar.getnames():
+            key, extension = name.split('.', 1)
+            samples.setdefault(key, []).append(extension)
+    assert list(samples.values()) == [['jpg', 'labeled.jpg', 'txt']]
+    key, = samples
+    assert key.startswith('camera_v2_recording_1715785200_000012_')
@@ -0,0 +1,210 @@
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+
+class InferenceRegion:
+    """
+    The part of a frame the models are executed on, configured per project:
+    - roi: static regions of interest, rectangles [x1, y1, x2, y2] or polygons [[x, y], ...] in coordinates
+      relative to the frame size (0-1). Only the bounding rectangle of the regions is passed to the models,
+      with the pixels outside the regions blacked out, and boxes with their centre outside the regions are dropped.
+    - tiles: [rows, columns], the (region of the) frame is split into overlapping tiles which are predicted
+      in a single batch, for high resolution cameras with small objects. Boxes of the same object in neighbouring
+      tiles, duplicates in the overlap or the parts of an object on a tile border, are merged.
+    The boxes are mapped back into frame coordinates, so the results look as if the whole frame was predicted.
+    """
+
+    def __init__(self, roi=None, tiles=None, tile_overlap=0.1, tile_merge=0.5):
+        """
+        Constructor.
+
+        Args:
+            roi: List of rectangles and polygons in relative coordinates, None for the whole frame.
+            tiles: Number of rows and columns of tiles, None to predict the region at once.
+            tile_overlap: Fraction of a tile that overlaps with its neighbours.
+            tile_merge: Boxes of the same class in different tiles are merged when their intersection covers
+                        more than this fraction of the smaller box.
+        """
+        self.polygons = [self.__to_polygon__(region) for region in roi] if roi else []
+        self.rows, self.columns = tiles if tiles else (1, 1)
+        if self.rows < 1 or self.columns < 1:
+            raise TypeError('Error while reading configuration file, tiles should be [rows, columns]')
+        self.tile_overlap = tile_overlap
+        self.tile_merge = tile_merge
+        # Masks and crop rectangles of the regions per frame size, cameras of a project rarely differ in resolution.
+        self._masks = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create the inference region of a project configuration.
+
+        Args:
+            config: The project configuration.
+
+        Returns:
+            InferenceRegion or None: None if the models predict the whole frame.
+        """
+        if not config.get('roi') and not config.get('tiles'):
+            return None
+        return cls(
+            roi=config.get('roi'),
+            tiles=config.get('tiles'),
+            tile_overlap=float(config.get('tile_overlap', 0.1)),
+            tile_merge=float(config.get('tile_merge', 0.5)))
+
+    @property
+    def is_tiled(self):
+        """
+        Whether a frame is split into several tiles.
+        """
+        return self.rows * self.columns > 1
+
+    def views(self, frame):
+        """
+        Cut the images the models have to predict out of a frame.
+
+        Args:
+            frame: The frame.
+
+        Returns:
+            list: (image, (x_offset, y_offset)) tuples, the offset of every image in the frame.
+        """
+        x1, y1, x2, y2 = 0, 0, frame.shape[1], frame.shape[0]
+        view = frame
+        if self.polygons:
+            mask, (x1, y1, x2, y2) = self.__mask__(frame.shape[:2])
+            view = frame[y1:y2, x1:x2]
+            if mask is not None:
+                view = cv2.bitwise_and(view, view, mask=mask[y1:y2, x1:x2])
+
+        if not self.is_tiled:
+            return [(view, (x1, y1))]
+
+        height, width = view.shape[:2]
+        tile_height = int(np.ceil(height / (self.rows - (self.rows - 1) * self.tile_overlap)))
+        tile_width = int(np.ceil(width / (self.columns - (self.columns - 1) * self.tile_overlap)))
+        tiles = []
+        for top in np.linspace(0, height - tile_height, self.rows).astype(int).tolist():
+            for left in np.linspace(0, width - tile_width, self.columns).astype(int).tolist():
+                tiles.append((view[top:top + tile_height, left:left + tile_width], (x1 + left, y1 + top)))
+        return tiles
+
+    def to_frame(self, frame, results, offsets):
+        """
+        Merge the results of the views of a frame into a single result in frame coordinates.
+
+        Args:
+            frame: The frame the views were cut out of.
+            results: The result of every view.
+            offsets: The offset of every view in the frame.
+
+        Returns:
+            Results: The boxes of all views, relative to the frame.
+        """
+        data, views = [], []
+        for index, (view_results, (x_offset, y_offset)) in enumerate(zip(results, offsets)):
+            boxes = view_results.boxes.data.clone()
+            boxes[:, :4] += torch.tensor([x_offset, y_offset, x_offset, y_offset],
+                                         dtype=boxes.dtype, device=boxes.device)
+            data.append(boxes)
+            views.append(torch.full((len(boxes),), index, device=boxes.device))
+        data = torch.cat(data) if data else torch.zeros((0, 6))
+
+        if len(results) > 1 and len(data):
+            data = self.__merge_tiles__(data, torch.cat(views))
+
+        if self.polygons and len(data):
+            mask, _ = self.__mask__(frame.shape[:2])
+            if mask is not None:
+                centres = ((data[:, :2] + data[:, 2:4]) / 2).long().cpu().numpy()
+                centres[:, 0] = centres[:, 0].clip(0, frame.shape[1] - 1)
+                centres[:, 1] = centres[:, 1].clip(0, frame.shape[0] - 1)
+                inside = torch.from_numpy(mask[centres[:, 1], centres[:, 0]] > 0).to(data.device)
+                data = data[inside]
+
+        return Results(orig_img=frame, path=results[0].path, names=results[0].names, boxes=data)
+
+    def __merge_tiles__(self, data, views):
+        """
+        Merge the boxes of the same object in different tiles into their enclosing box, in descending confidence.
+
+        Args:
+            data: The boxes of all tiles in frame coordinates, xyxy, (track id), conf, cls.
+            views: The tile of every box.
+
+        Returns:
+            torch.Tensor: The merged boxes.
+        """
+        xyxy = data[:, :4].float()
+        top_left = torch.maximum(xyxy[:, None, :2], xyxy[None, :, :2])
+        bottom_right = torch.minimum(xyxy[:, None, 2:], xyxy[None, :, 2:])
+        intersection = (bottom_right - top_left).clamp(min=0).prod(dim=2)
+        area = (xyxy[:, 2:] - xyxy[:, :2]).prod(dim=1)
+        smaller_area = torch.minimum(area[:, None], area[None, :]).clamp(min=1e-9)
+        same_object = ((intersection / smaller_area > self.tile_merge)
+                       & (data[:, None, -1] == data[None, :, -1])
+                       & (views[:, None] != views[None, :]))
+
+        merged = []
+        used = torch.zeros(len(data), dtype=torch.bool, device=data.device)
+        for index in torch.argsort(data[:, -2], descending=True).tolist():
+            if used[index]:
+                continue
+            group = same_object[index] & ~used
+            group[index] = True
+            used |= group
+
+            box = data[index].clone()
+            box[:2] = data[group, :2].min(dim=0).values
+            box[2:4] = data[group, 2:4].max(dim=0).values
+            merged.append(box)
+        return torch.stack(merged)
+
+    def __mask__(self, shape):
+        """
+        Mask of the regions and their bounding rectangle for a frame size.
+
+        Args:
+            shape: Height and width of the frame.
+
+        Returns:
+            tuple: The mask (None if the regions are a single rectangle) and the rectangle (x1, y1, x2, y2).
+        """
+        if shape not in self._masks:
+            height, width = shape
+            polygons = [np.round(polygon * [width, height]).astype(np.int32) for polygon in self.polygons]
+            points = np.concatenate(polygons)
+            x1, y1 = np.clip(points.min(axis=0), 0, [width - 1, height - 1]).tolist()
+            x2, y2 = np.clip(points.max(axis=0), 1, [width, height]).tolist()
+
+            mask = None
+            is_rectangle = len(polygons) == 1 and len(polygons[0]) == 4 and np.array_equal(
+                polygons[0], [[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+            if not is_rectangle:
+                mask = np.zeros((height, width), dtype=np.uint8)
+                cv2.fillPoly(mask, polygons, 255)
+            self._masks[shape] = (mask, (x1, y1, x2, y2))
+        return self._masks[shape]
+
+    @staticmethod
+    def __to_polygon__(region):
+        """
+        Polygon of a configured region.
+
+        Args:
+            region: A rectangle [x1, y1, x2, y2] or a polygon [[x, y], ...] in relative coordinates.
+
+        Returns:
+            numpy.ndarray: The corners of the polygon.
+        """
+        if len(region) == 4 and all(isinstance(value, (int, float)) for value in region):
+            x1, y1, x2, y2 = region
+            region = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+        polygon = np.array(region, dtype=np.float64)
+        if polygon.ndim != 2 or polygon.shape[1] != 2 or len(polygon) < 3:
+            raise TypeError('Error while reading configuration file, '
+                            'every roi should be a rectangle [x1, y1, x2, y2] or a polygon [[x, y], ...]')
+        return polygon
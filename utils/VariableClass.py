@@ -31,6 +31,16 @@ class VariableClass:
         self.STORAGE_URI = os.getenv("STORAGE_URI")
         self.STORAGE_ACCESS_KEY = os.getenv("STORAGE_ACCESS_KEY")
         self.STORAGE_SECRET_KEY = os.getenv("STORAGE_SECRET_KEY")
+        # Seconds to wait for Kerberos Vault to respond, and retries of failed requests.
+        self.VAULT_TIMEOUT = float(os.getenv("VAULT_TIMEOUT", "60"))
+        self.VAULT_MAX_RETRIES = int(os.getenv("VAULT_MAX_RETRIES", "3"))
+        # Collect deletes and send them in groups of VAULT_DELETE_BATCH_SIZE (1 = right away),
+        # or after VAULT_DELETE_FLUSH_INTERVAL seconds.
+        self.VAULT_DELETE_BATCH_SIZE = int(os.getenv("VAULT_DELETE_BATCH_SIZE", "1"))
+        self.VAULT_DELETE_FLUSH_INTERVAL = float(os.getenv("VAULT_DELETE_FLUSH_INTERVAL", "30"))
+        # Local cache for retrieved recordings, so redelivered messages do not hit the vault again (empty = disabled).
+        self.MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "")
+        self.MEDIA_CACHE_SIZE = int(os.getenv("MEDIA_CACHE_SIZE", "2048"))
 
         # Feature parameters
         self.PROJECT_NAME = os.getenv("PROJECT_NAME")
@@ -80,17 +90,82 @@ class VariableClass:
             self.MIN_DETECTIONS = int(os.getenv("MIN_DETECTIONS", "5"))
         self.FRAMES_SKIP_AFTER_DETECT = int(os.getenv("FRAMES_SKIP_AFTER_DETECT", "50"))
         self.IOU = float(os.getenv("IOU", "0.85"))
+        # Duplicated boxes of the merged model results are found by their centres ("center") or their overlap ("iou").
+        self.DUPLICATE_SUPPRESSION = os.getenv("DUPLICATE_SUPPRESSION", "center")
+        self.DUPLICATE_IOU = float(os.getenv("DUPLICATE_IOU", "0.7"))
+        # Of the duplicated boxes, keep the first one in label order ("first") or the most confident one ("confidence").
+        self.DUPLICATE_KEEP = os.getenv("DUPLICATE_KEEP", "first")
+        # Drop frames that differ at most DEDUP_MAX_DISTANCE hash bits from one of the last DEDUP_HISTORY saved frames
+        # of the same camera, with their boxes in the same cells of a DEDUP_GRID x DEDUP_GRID grid (-1 = disabled).
+        self.DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "-1"))
+        self.DEDUP_HISTORY = int(os.getenv("DEDUP_HISTORY", "32"))
+        self.DEDUP_GRID = int(os.getenv("DEDUP_GRID", "4"))
+
+        # Performance parameters
+        # Adaptive sampling: the stride grows up to SAMPLING_MAX_STRIDE x the stride of CLASSIFICATION_FPS through empty
+        # stretches, and shrinks to 1 / SAMPLING_DENSIFY of it around detections and scene changes. At most
+        # SAMPLING_BUDGET x MAX_NUMBER_OF_PREDICTIONS frames are evaluated per video (1, 1, 0 = uniform sampling).
+        self.SAMPLING_MAX_STRIDE = int(os.getenv("SAMPLING_MAX_STRIDE", "1"))
+        self.SAMPLING_DENSIFY = int(os.getenv("SAMPLING_DENSIFY", "1"))
+        self.SAMPLING_BUDGET = int(os.getenv("SAMPLING_BUDGET", "0"))
+        # Only run the models on a sampled frame when at least MOTION_THRESHOLD (0-1) of its pixels changed more than
+        # MOTION_PIXEL_THRESHOLD gray levels since the last evaluated frame, or after MOTION_MAX_SKIPPED skipped frames
+        # (0 = disabled).
+        self.MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "0"))
+        self.MOTION_PIXEL_THRESHOLD = int(os.getenv("MOTION_PIXEL_THRESHOLD", "25"))
+        self.MOTION_MAX_SKIPPED = int(os.getenv("MOTION_MAX_SKIPPED", "10"))
+        # Number of sampled frames that are sent through the models at once (1 = frame by frame).
+        self.BATCH_SIZE = int(os.getenv("BATCH_SIZE", "1"))
+        # Decode the sampled frames in a background thread, while the models are busy.
+        self.DECODE_AHEAD = os.getenv("DECODE_AHEAD") == "True"
+        self.FRAME_QUEUE_SIZE = int(os.getenv("FRAME_QUEUE_SIZE", "8"))
+        # Seek instead of grabbing frames one by one when at least SEEK_THRESHOLD frames are skipped (0 = never seek).
+        self.SEEK_THRESHOLD = int(os.getenv("SEEK_THRESHOLD", "0"))
+        # Execute the models of a project concurrently instead of one after the other.
+        self.PARALLEL_MODELS = os.getenv("PARALLEL_MODELS") == "True"
+        # Number of videos processed concurrently by queue_harvesting.py, the workers share the loaded models.
+        self.NUMBER_OF_WORKERS = int(os.getenv("NUMBER_OF_WORKERS", "1"))
+        # Codec of the exported frames (png, jpeg, webp) and its quality, or compression level for png (-1 = default).
+        self.IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "png")
+        self.IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "-1"))
+        # Upload every saved file during the evaluation, only the remaining files are uploaded after the video.
+        self.STREAM_UPLOAD = os.getenv("STREAM_UPLOAD") == "True"
+        # Maximum size in MB of a tar shard of the shard export.
+        self.SHARD_MAX_SIZE = int(os.getenv("SHARD_MAX_SIZE", "256"))
+        # Number of threads writing the exported frames in the background (0 = write in the inference loop).
+        self.EXPORT_WRITER_WORKERS = int(os.getenv("EXPORT_WRITER_WORKERS", "0"))
+        self.EXPORT_QUEUE_SIZE = int(os.getenv("EXPORT_QUEUE_SIZE", "16"))
+        # Use the asyncio service: messages are pushed by RabbitMQ and network I/O overlaps with the inference.
+        self.ASYNC_SERVICE = os.getenv("ASYNC_SERVICE") == "True"
+        # Number of messages of which the media is retrieved ahead, while a video is evaluated (0 = disabled).
+        self.PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "0"))
+        # Maximum disk usage of the prefetched media in MB (0 = unlimited).
+        self.PREFETCH_MAX_DISK_USAGE = int(os.getenv("PREFETCH_MAX_DISK_USAGE", "4096"))
 
         # Integration parameters
         self.INTEGRATION_NAME = os.getenv("INTEGRATION_NAME")
+        # SQLite journal of the uploaded files, to resume and deduplicate uploads after a restart (empty = disabled).
+        self.UPLOAD_JOURNAL = os.getenv("UPLOAD_JOURNAL", "")
 
         # Roboflow parameters
         self.ROBOFLOW_API_KEY = os.getenv("RBF_API_KEY")
         self.ROBOFLOW_WORKSPACE = os.getenv("RBF_WORKSPACE")
         self.ROBOFLOW_PROJECT = os.getenv("RBF_PROJECT")
+        # Collect the images of several videos and upload them in batches of ROBOFLOW_BATCH_SIZE (0 = per video).
+        self.ROBOFLOW_BATCH_SIZE = int(os.getenv("RBF_BATCH_SIZE", "0"))
+        self.ROBOFLOW_UPLOAD_WORKERS = int(os.getenv("RBF_UPLOAD_WORKERS", "10"))
+        self.ROBOFLOW_UPLOAD_RETRIES = int(os.getenv("RBF_UPLOAD_RETRIES", "3"))
 
         # S3 parameters
         self.S3_ENDPOINT = os.getenv("S3_ENDPOINT")
         self.S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY")
         self.S3_SECRET_KEY = os.getenv("S3_SECRET_KEY")
         self.S3_BUCKET = os.getenv("S3_BUCKET")
+        # Number of files uploaded concurrently, they share one pooled client.
+        self.S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", "8"))
+        # Files larger than S3_MULTIPART_THRESHOLD MB are uploaded in parts of S3_MULTIPART_CHUNKSIZE MB.
+        self.S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", "64"))
+        self.S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", "16"))
+        # Number of attempts of a failed upload, waiting S3_RETRY_BACKOFF * 2^attempt seconds in between.
+        self.S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "5"))
+        self.S3_RETRY_BACKOFF = float(os.getenv("S3_RETRY_BACKOFF", "0.5"))
@@ -16,6 +16,7 @@ class TimeVerbose:
         self.total_time_class_prediction = 0
         self.total_time_processing = 0
         self.total_time_postprocessing = 0
+        self.total_time_model_reset = 0
         self.start_time_preprocessing = time.time()
 
     def add_preprocessing_time(self):
@@ -42,3 +43,5 @@ class TimeVerbose:
             f'\t\t\t - {round(self.total_time_processing - self.total_time_class_prediction, 2)}s for other processing')
         print(
             f'\t\t - {round(self.total_time_postprocessing, 2)}s for postprocessing')
+        print(
+            f'\t\t - {round(self.total_time_model_reset, 4)}s for resetting the model trackers')